@@ -68,7 +68,8 @@ STATS_FILE = os.path.join(JSON_DIR, 'global_stats.json')
 UPTIME_FILE = os.path.join(JSON_DIR, 'uptime_stats.json')
 PORTFOLIO_FILE = os.path.join(JSON_DIR, 'portfolio.json')
 STYLE_CONFIG_FILE = os.path.join(JSON_DIR, 'style_config.json')
-RSI_PEAK_TRACKER_FILE = os.path.join(JSON_DIR, 'rsi_peak_tracker.json')
+RSI_PEAK_TRACKER_FILE = os.path.join(JSON_DIR, 'rsi_peak_tracker.pkl')
+LEGACY_RSI_PEAK_TRACKER_FILE = os.path.join(JSON_DIR, 'rsi_peak_tracker.json')
 
 # --- Default Values ---
 DEFAULT_PORTFOLIO_BALANCE = 1000.0
@@ -1,40 +1,131 @@
+import os
 import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 class EventBus:
     """A simple thread-safe event bus using a queue."""
+    MAX_QUEUE_SIZE = 10_000
+    PUBLISH_TIMEOUT_SECONDS = 1
+    # High-frequency topics are coalesced: only the latest payload per key (payload field) is delivered.
+    # STATE_UPDATED_RSI is already batched by the StateManager, so it is not coalesced here.
+    COALESCED_EVENTS = {'STATE_UPDATED_MARKET': None}
+    _NO_SUBSCRIBERS = ((), ())
+
     def __init__(self):
-        self.event_queue = queue.Queue()
+        self.event_queue = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
         self.subscribers = {}
         self.lock = threading.Lock()
+        self._latest_by_type = {}
+        self._coalesce_lock = threading.Lock()
+        # Reusable workers for subscriber callbacks, so dispatch never spawns a thread per event
+        self._executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 2), thread_name_prefix="evbus")
+        self._dispatcher_thread = None
 
-    def subscribe(self, event_type, callback):
-        """Subscribe a callback to a specific event type."""
+    def subscribe(self, event_type, callback, batched=False):
+        """
+        Subscribe a callback to a specific event type.
+        Batched subscribers receive a list with every payload of that type drained in one pass.
+        """
         with self.lock:
-            if event_type not in self.subscribers:
-                self.subscribers[event_type] = []
-            self.subscribers[event_type].append(callback)
+            # Each topic maps to immutable (plain, batched) callback tuples that are replaced, never
+            # mutated, so the dispatcher can read them without the lock or a per-callback mode check.
+            plain, batched_callbacks = self.subscribers.get(event_type, self._NO_SUBSCRIBERS)
+            if batched:
+                batched_callbacks += (callback,)
+            else:
+                plain += (callback,)
+            self.subscribers[event_type] = (plain, batched_callbacks)
 
     def publish(self, event_type, data=None):
         """Publish an event to the bus."""
+        if event_type in self.COALESCED_EVENTS:
+            self._publish_coalesced(event_type, data)
+            return
         event = {'type': event_type, 'data': data}
-        self.event_queue.put(event)
+        try:
+            self.event_queue.put(event, timeout=self.PUBLISH_TIMEOUT_SECONDS)
+        except queue.Full:
+            print(f"🚨 Event queue full. Dropping event {event_type}.")
+
+    def _publish_coalesced(self, event_type, data):
+        """Stores the latest payload and enqueues a single marker while one is not already pending."""
+        key_field = self.COALESCED_EVENTS[event_type]
+        key = data.get(key_field) if key_field and isinstance(data, dict) else None
+        with self._coalesce_lock:
+            pending = self._latest_by_type.get(event_type)
+            needs_marker = pending is None
+            if needs_marker:
+                pending = self._latest_by_type[event_type] = {}
+            pending.pop(key, None)
+            pending[key] = data
+        if needs_marker:
+            # At most one marker per topic is outstanding, so blocking here is bounded back-pressure
+            self.event_queue.put({'type': event_type, 'coalesced': True})
+
+    def _expand(self, event):
+        """Yields the payloads carried by a queued event (several for a coalesce marker)."""
+        if not event.get('coalesced'):
+            yield event['data']
+            return
+        with self._coalesce_lock:
+            pending = self._latest_by_type.pop(event['type'], {})
+        yield from pending.values()
+
+    def _drain_batch(self):
+        """Blocks for the first event, then drains whatever else is already queued."""
+        batch = [self.event_queue.get()]
+        try:
+            while True:
+                batch.append(self.event_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _dispatch(self, event_type, callback, data):
+        try:
+            # Run callback on the worker pool to avoid blocking the bus
+            self._executor.submit(self._run_callback, event_type, callback, data)
+        except Exception as e:
+            print(f"🚨 Error scheduling callback for event {event_type}: {e}")
+
+    @staticmethod
+    def _run_callback(event_type, callback, data):
+        try:
+            callback(data)
+        except Exception as e:
+            print(f"🚨 Error executing callback for event {event_type}: {e}")
+
+    def start(self):
+        """Starts the single dispatcher thread that drains the queue."""
+        if self._dispatcher_thread and self._dispatcher_thread.is_alive():
+            return
+        self._dispatcher_thread = threading.Thread(target=self.process_events, name="evbus-dispatch", daemon=True)
+        self._dispatcher_thread.start()
+
+    def shutdown(self):
+        """Stops accepting new callbacks without waiting for running ones."""
+        self._executor.shutdown(wait=False)
 
     def process_events(self):
         """Continuously process events from the queue and dispatch to subscribers."""
         while True:
             try:
-                event = self.event_queue.get()
-                event_type = event.get('type')
-                with self.lock:
-                    if event_type in self.subscribers:
-                        for callback in self.subscribers[event_type]:
-                            try:
-                                # Run callback in a new thread to avoid blocking the bus
-                                threading.Thread(target=callback, args=(event['data'],)).start()
-                            except Exception as e:
-                                print(f"🚨 Error executing callback for event {event_type}: {e}")
-            except queue.Empty:
-                continue # Should not happen with a blocking get()
+                batch = self._drain_batch()
+                subscribers = self.subscribers
+                batched_payloads = {}
+
+                for event in batch:
+                    event_type = event.get('type')
+                    plain, batched = subscribers.get(event_type, self._NO_SUBSCRIBERS)
+
+                    for data in self._expand(event):
+                        for callback in plain:
+                            self._dispatch(event_type, callback, data)
+                        for callback in batched:
+                            batched_payloads.setdefault((event_type, callback), []).append(data)
+
+                for (event_type, callback), payloads in batched_payloads.items():
+                    self._dispatch(event_type, callback, payloads)
             except Exception as e:
                 print(f"🚨 Critical error in event bus processing loop: {e}")
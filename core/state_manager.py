@@ -1,6 +1,10 @@
+import heapq
+import itertools
 import threading
 import time
-from datetime import datetime, timedelta
+import types
+from collections import deque
+import numpy as np
 import config
 
 class StateManager:
@@ -10,12 +14,19 @@ class StateManager:
     """
     def __init__(self, event_bus):
         self.event_bus = event_bus
+        # Guards trades, cooldowns, portfolio and stats. coin_data/rsi_data entries are replaced with
+        # single dict stores (atomic under the GIL), so market ticks never wait on this lock.
         self.lock = threading.RLock()
+        self._alert_log_lock = threading.Lock()
 
         # --- Live Data ---
+        # coin_data/rsi_data are single flat dicts on purpose: writers replace whole per-symbol
+        # entries and readers take dict() copies, so neither needs the lock. Sharding would only
+        # pay off on free-threaded builds and would break the direct lookups other services use.
         self.coin_data = {}
         self.rsi_data = {}
         self.active_trades = {}
+        self.active_trades_by_alert = {} # alert_num -> symbol, kept in step by add/remove_active_trade
         self.alerted_coins = {}
         self.cooldowned_coins = {} # <-- NEW: To store cooldown data from the new DB
         self.listing_times = {}
@@ -27,19 +38,37 @@ class StateManager:
         self.bot_start_time = time.time()
         self.total_uptime_seconds = 0
 
-        # --- Control Flags ---
-        self.controls = {
+        # --- Control Flags (membership is fixed after init; only the Events change) ---
+        self.controls = types.MappingProxyType({
             "websocket_enabled": threading.Event(), "rsi_enabled": threading.Event(),
             "trading_enabled": threading.Event(), "email_enabled": threading.Event(),
             "monitor_all_coins": threading.Event(), "global_pause_active": threading.Event(),
             "trade_execution_enabled": threading.Event()
-        }
+        })
+        # Bound once for the trade-gate hot path (Event.is_set() itself takes no lock)
+        self._trade_execution_flag = self.controls["trade_execution_enabled"]
+        self._global_pause_flag = self.controls["global_pause_active"]
         self.styles = config.DEFAULT_STYLES.copy()
 
         # --- Status ---
         self.rsi_status = {"status": "initializing", "message": "Waiting for initial data...", "current_coin": None}
-        self.alert_log = []
+        self.alert_log = deque(maxlen=50)
         self.last_trade_execution_time = 0
+        self._alert_time_cache = (None, '')
+        self._pause_expiry = None
+
+        # --- RSI update coalescing: symbols changed since the last STATE_UPDATED_RSI ---
+        self._dirty_rsi_symbols = set()
+        self._last_rsi_publish = 0
+
+        # --- get_symbols_to_monitor memo, invalidated by market updates ---
+        self._market_version = 0
+        self._symbols_cache = (None, None)
+        # When the last ticker frame arrived; the stream only carries symbols that changed,
+        # so every coin_data price is current while frames keep coming
+        self.market_data_time = 0.0
+        # (threshold, count) of coins at or above RSI_HOT_COIN_THRESHOLD, maintained by update_market_data
+        self._hot_coins = (None, 0)
 
         self._initialize_controls()
 
@@ -61,36 +90,66 @@ class StateManager:
             self.portfolio['balance'] = new_balance
         self.event_bus.publish('PORTFOLIO_UPDATED', None)
 
+    def add_active_trade(self, symbol, trade):
+        """Registers an open trade and its alert number index together."""
+        with self.lock:
+            self.active_trades[symbol] = trade
+            self.active_trades_by_alert[trade['alert_num']] = symbol
+
+    def remove_active_trade(self, symbol):
+        """Removes an open trade and its index entry; returns the trade or None."""
+        with self.lock:
+            trade = self.active_trades.pop(symbol, None)
+            if trade is not None:
+                self.active_trades_by_alert.pop(trade['alert_num'], None)
+            return trade
+
     def restore_live_trade(self, symbol, entry_price, trade_amount, leverage, alert_num, entry_rsi):
         with self.lock:
             if symbol in self.active_trades: return
-            now = datetime.now()
-            self.active_trades[symbol] = {
-                'alert_num': alert_num, 'entry_price': entry_price, 'entry_time': now.timestamp(),
+            self.add_active_trade(symbol, {
+                'alert_num': alert_num, 'entry_price': entry_price, 'entry_time': time.time(),
                 'entry_rsi': entry_rsi, 'trade_amount': trade_amount, 'leverage': leverage,
                 'pnl_percent': 0, 'pnl_usdt': 0, 'source': 'Live',
-                'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0, 'max_neg_rsi': entry_rsi if isinstance(entry_rsi, (int, float)) else 0
-            }
+                'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0, 'max_neg_rsi': entry_rsi if type(entry_rsi) is float else 0
+            })
 
     def get_full_state_snapshot(self):
+        # Market and RSI dicts are copied in one C-level call each, without the trades lock
+        return self._build_snapshot(dict(self.coin_data), dict(self.rsi_data))
+
+    def get_readonly_snapshot(self):
+        """
+        Same shape as get_full_state_snapshot, but coin_data and rsi_data are live read-only views.
+        Consumers must tolerate concurrent updates: iterate over list(view.items()) and never mutate entries.
+        """
+        return self._build_snapshot(types.MappingProxyType(self.coin_data), types.MappingProxyType(self.rsi_data))
+
+    def _build_snapshot(self, coin_data_copy, rsi_data_copy):
+        with self._alert_log_lock:
+            alert_log_copy = list(itertools.islice(self.alert_log, 20))
+        # Event.is_set() needs no outer lock and the controls mapping is read-only
+        controls_copy = {name: event.is_set() for name, event in self.controls.items()}
+
         with self.lock:
-            active_trades_copy = {k: v.copy() for k, v in self.active_trades.items()}
+            # Shallow copies: records hold only scalars and snapshot consumers never mutate them
+            active_trades_copy = dict(self.active_trades)
             # --- MODIFIED: Use the new cooldowned_coins dictionary ---
-            cooldowned_coins_copy = {k: v.copy() for k, v in self.cooldowned_coins.items()}
+            cooldowned_coins_copy = dict(self.cooldowned_coins)
 
             return {
-                "coin_data": self.coin_data.copy(),
-                "rsi_data": self.rsi_data.copy(),
+                "coin_data": coin_data_copy,
+                "rsi_data": rsi_data_copy,
                 "active_trades": active_trades_copy,
                 "alerted_coins": cooldowned_coins_copy, # Return cooldowned_coins as alerted_coins for UI
                 "portfolio": self.portfolio.copy(),
                 "global_stats": self.global_stats.copy(),
                 "bot_start_time": self.bot_start_time,
                 "total_uptime_seconds": self.total_uptime_seconds,
-                "controls": {name: event.is_set() for name, event in self.controls.items()},
+                "controls": controls_copy,
                 "styles": self.styles.copy(),
                 "rsi_status": self.rsi_status.copy(),
-                "alert_log": self.alert_log[:20]
+                "alert_log": alert_log_copy
             }
 
     def get_symbols_to_monitor(self):
@@ -98,66 +157,132 @@ class StateManager:
             MAX_COINS_TO_MONITOR = 100
             BASE_THRESHOLD = config.RSI_HOT_COIN_THRESHOLD
 
-            all_coins_sorted = sorted(self.coin_data.values(), key=lambda x: x.get('change_24h', 0), reverse=True)
-            hot_coins_above_base = [c for c in all_coins_sorted if c.get('change_24h', 0) >= BASE_THRESHOLD]
+            cache_key = (self._market_version, BASE_THRESHOLD, frozenset(self.active_trades), frozenset(self.cooldowned_coins))
+            if self._symbols_cache[0] == cache_key:
+                return self._symbols_cache[1]
+
+            # Snapshot once: market ticks update coin_data without taking the lock
+            changes = {c['symbol']: c.get('change_24h', 0) for c in list(self.coin_data.values())}
 
+            # Only the MAX_COINS_TO_MONITOR-th largest change is needed, not a full sort
+            top_changes = heapq.nlargest(MAX_COINS_TO_MONITOR, changes.values())
             dynamic_threshold = BASE_THRESHOLD
-            if len(hot_coins_above_base) > MAX_COINS_TO_MONITOR:
-                dynamic_threshold = hot_coins_above_base[MAX_COINS_TO_MONITOR - 1].get('change_24h', BASE_THRESHOLD)
+            if len(top_changes) == MAX_COINS_TO_MONITOR:
+                dynamic_threshold = max(BASE_THRESHOLD, top_changes[-1])
 
-            final_hot_coins = [c['symbol'] for c in hot_coins_above_base if c.get('change_24h', 0) >= dynamic_threshold]
+            final_hot_coins = [s for s, change in changes.items() if change >= dynamic_threshold]
             
             # --- MODIFIED: Check against the new cooldowned_coins dictionary ---
             symbols_set = set(self.active_trades.keys()) | set(self.cooldowned_coins.keys()) | set(final_hot_coins)
             
-            return sorted(list(symbols_set), key=lambda s: self.coin_data.get(s, {}).get('change_24h', 0), reverse=True)
+            # Decorate once so the sort compares plain tuples instead of calling a key lambda
+            changes_get = changes.get
+            decorated = [(changes_get(s, 0), s) for s in symbols_set]
+            decorated.sort(reverse=True)
+            symbols = [s for _, s in decorated]
+            self._symbols_cache = (cache_key, symbols)
+            return symbols
 
 
     def can_open_new_trade(self):
-        with self.lock:
-            return (
-                self.controls["trade_execution_enabled"].is_set() and
-                not self.controls["global_pause_active"].is_set() and
-                len(self.active_trades) < config.MAX_OPEN_TRADES and
-                (time.time() - self.last_trade_execution_time) > 10
-            )
-
-    def update_market_data(self, data_list):
-        with self.lock:
-            for data in data_list:
-                symbol = data.get('s')
-                if not (symbol and symbol.endswith('USDT')): continue
-                
-                self.coin_data[symbol] = {
-                    'symbol': symbol,
-                    'price': float(data.get('c', 0)), 
-                    'change_24h': float(data.get('P', 0)),
-                    'high_24h': float(data.get('h', 0)),
-                    'listing_time': self.listing_times.get(symbol)
-                }
+        # Flag checks first: with execution disabled (the default) this returns without any lock
+        if not self._trade_execution_flag.is_set():
+            return False
+        self.check_global_pause_expiry()
+        # Single reads of a flag, a dict length and a float; no lock needed
+        return (
+            not self._global_pause_flag.is_set() and
+            len(self.active_trades) < config.MAX_OPEN_TRADES and
+            (time.time() - self.last_trade_execution_time) > 10
+        )
+
+    def update_market_data(self, data_list, valid_symbols=None):
+        """Applies a ticker frame, keeping only symbols in valid_symbols (any USDT pair when it is None)."""
+        self.market_data_time = time.time()
+        if valid_symbols is None:
+            rows = [data for data in data_list if (data.get('s') or '').endswith('USDT')]
+        else:
+            rows = [data for data in data_list if data.get('s') in valid_symbols]
+        if not rows:
+            return # Nothing valid in this frame, no update to publish
+        # Convert the price/change/high strings of the whole batch in one NumPy call
+        values = np.array([(data.get('c', 0), data.get('P', 0), data.get('h', 0)) for data in rows], dtype=np.float64).tolist()
+        coin_data, listing_times = self.coin_data, self.listing_times
+        hot_threshold = config.RSI_HOT_COIN_THRESHOLD
+        counted_threshold, hot_count = self._hot_coins
+        if counted_threshold != hot_threshold:
+            hot_count = self._count_hot_coins(hot_threshold)
+
+        # No lock: each symbol's entry is replaced with a single dict store
+        for data, (price, change_24h, high_24h) in zip(rows, values):
+            symbol = data['s']
+            listing_time = listing_times.get(symbol)
+            current = coin_data.get(symbol)
+            if (current and current['price'] == price and current['change_24h'] == change_24h
+                    and current['high_24h'] == high_24h and current['listing_time'] == listing_time):
+                continue # Unchanged, keep the existing entry
+
+            if current:
+                hot_count -= current['change_24h'] >= hot_threshold
+            hot_count += change_24h >= hot_threshold
+            coin_data[symbol] = {
+                'symbol': symbol,
+                'price': price, 
+                'change_24h': change_24h,
+                'high_24h': high_24h,
+                'listing_time': listing_time
+            }
+        self._hot_coins = (hot_threshold, hot_count)
+        self._market_version += 1
         self.event_bus.publish('STATE_UPDATED_MARKET')
 
+    def _count_hot_coins(self, threshold):
+        return sum(1 for coin in list(self.coin_data.values()) if coin['change_24h'] >= threshold)
+
+    def get_hot_coins_count(self):
+        """Number of coins whose 24h change is at or above RSI_HOT_COIN_THRESHOLD."""
+        threshold, count = self._hot_coins
+        if threshold != config.RSI_HOT_COIN_THRESHOLD:
+            # Threshold edited since the last frame: count once here, the next frame resyncs the counter
+            return self._count_hot_coins(config.RSI_HOT_COIN_THRESHOLD)
+        return count
+
     def update_listing_times(self, times_dict):
         with self.lock:
             self.listing_times = times_dict
 
     def update_rsi_value(self, symbol, rsi_value):
+        now = time.time()
+        # Settings can change at runtime via /update-config, so read them per call, but only once and outside the lock
+        alert_threshold = config.RSI_ALERT_THRESHOLD
+        stale_cutoff = now - config.STALE_SIGNAL_LOOKBACK_HOURS * 3600
         with self.lock:
             self.rsi_data[symbol] = rsi_value
+            self._dirty_rsi_symbols.add(symbol)
             current_price = self.coin_data.get(symbol, {}).get('price')
 
-            if isinstance(rsi_value, (int, float)):
-                if rsi_value > config.RSI_ALERT_THRESHOLD and current_price:
+            # RSI values are plain floats; anything else is a status marker ('New_Coin', 'Cant_Fetch', ...)
+            if type(rsi_value) is float:
+                if rsi_value > alert_threshold and current_price:
                     peak_info = self.rsi_peak_tracker.get(symbol)
-                    now = time.time()
                     
-                    if not peak_info or (now - peak_info.get('timestamp', 0)) > (config.STALE_SIGNAL_LOOKBACK_HOURS * 3600):
+                    if not peak_info or peak_info.get('timestamp', 0) < stale_cutoff:
                         self.rsi_peak_tracker[symbol] = {'peak_price': current_price, 'timestamp': now}
                     elif current_price > peak_info.get('peak_price', 0):
                         peak_info['peak_price'] = current_price
                         peak_info['timestamp'] = now
-        
-        self.event_bus.publish('STATE_UPDATED_RSI', {'symbol': symbol, 'rsi': rsi_value})
+
+        if now - self._last_rsi_publish >= config.UI_REFRESH_SECONDS:
+            self.flush_rsi_updates()
+
+    def flush_rsi_updates(self):
+        """Publishes one STATE_UPDATED_RSI for every symbol updated since the last publish."""
+        with self.lock:
+            if not self._dirty_rsi_symbols: return
+            symbols = frozenset(self._dirty_rsi_symbols)
+            self._dirty_rsi_symbols.clear()
+            self._last_rsi_publish = time.time()
+        self.event_bus.publish('STATE_UPDATED_RSI', {'symbols': symbols})
 
     def open_trade(self, symbol, price, rsi_value, change_24h, source, alert_number, log_message=None, trade_amount=None):
         with self.lock:
@@ -173,16 +298,16 @@ class StateManager:
                 self.add_alert_log(f"SKIP: {symbol}", "Insufficient Funds")
                 return False
 
-            now = datetime.now()
-            self.active_trades[symbol] = {
-                'alert_num': alert_number, 'entry_price': price, 'entry_time': now.timestamp(),
+            now = time.time()
+            self.add_active_trade(symbol, {
+                'alert_num': alert_number, 'entry_price': price, 'entry_time': now,
                 'entry_rsi': rsi_value, 'trade_amount': trade_amount, 'leverage': config.LEVERAGE,
                 'pnl_percent': 0, 'pnl_usdt': 0, 'source': source,
-                'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0, 'max_neg_rsi': rsi_value if isinstance(rsi_value, (int, float)) else 0
-            }
-            self.last_trade_execution_time = time.time()
+                'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0, 'max_neg_rsi': rsi_value if type(rsi_value) is float else 0
+            })
+            self.last_trade_execution_time = now
             
-            final_log_message = log_message if log_message is not None else (f"{rsi_value:.2f}" if isinstance(rsi_value, (int, float)) else rsi_value)
+            final_log_message = log_message if log_message is not None else (f"{rsi_value:.2f}" if type(rsi_value) is float else rsi_value)
             self.add_alert_log(f"OPEN SHORT ({source}): {symbol}", final_log_message)
 
         self.event_bus.publish('TRADE_OPENED', self.active_trades[symbol].copy())
@@ -190,8 +315,8 @@ class StateManager:
 
     def close_trade(self, symbol, reason, close_price, exit_rsi):
         with self.lock:
-            if symbol not in self.active_trades: return
-            trade_data = self.active_trades.pop(symbol)
+            trade_data = self.remove_active_trade(symbol)
+            if trade_data is None: return
 
             if trade_data.get('source', 'Bot').lower() != 'live':
                 pnl_usdt = trade_data['pnl_usdt']
@@ -213,8 +338,9 @@ class StateManager:
             })
             self.add_alert_log(f"CLOSE SHORT: {symbol}", reason)
 
+        # The trade has already left active_trades_by_alert, so the symbol travels with the event
         self.event_bus.publish('TRADE_CLOSED', {
-            'trade_data': trade_data, 'reason': reason, 'close_price': close_price,
+            'symbol': symbol, 'trade_data': trade_data, 'reason': reason, 'close_price': close_price,
             'exit_rsi': exit_rsi, 'new_balance': self.portfolio.get('balance', 0)
         })
         self.event_bus.publish('STATS_UPDATED')
@@ -223,24 +349,44 @@ class StateManager:
 
     def update_trade_pnl(self, symbol, pnl_percent, pnl_usdt, current_rsi):
         with self.lock:
-            if symbol in self.active_trades:
-                trade = self.active_trades[symbol]
-                trade['pnl_percent'] = pnl_percent
-                trade['pnl_usdt'] = pnl_usdt
+            self._apply_trade_pnl_locked(symbol, pnl_percent, pnl_usdt, current_rsi)
 
-                if current_rsi is not None and isinstance(current_rsi, (int, float)):
-                    if pnl_percent < trade['max_neg_pnl_pct']:
-                        trade['max_neg_pnl_pct'] = pnl_percent
-                    if pnl_usdt < trade['max_neg_pnl_usdt']:
-                        trade['max_neg_pnl_usdt'] = pnl_usdt
-                    if current_rsi < trade['max_neg_rsi']:
-                        trade['max_neg_rsi'] = current_rsi
+    def update_trade_pnls(self, updates):
+        """Applies (symbol, pnl_percent, pnl_usdt, current_rsi) rows under a single lock acquisition."""
+        with self.lock:
+            for symbol, pnl_percent, pnl_usdt, current_rsi in updates:
+                self._apply_trade_pnl_locked(symbol, pnl_percent, pnl_usdt, current_rsi)
+
+    def _apply_trade_pnl_locked(self, symbol, pnl_percent, pnl_usdt, current_rsi):
+        trade = self.active_trades.get(symbol)
+        if trade is None: return
+        trade['pnl_percent'] = pnl_percent
+        trade['pnl_usdt'] = pnl_usdt
+
+        if type(current_rsi) is float:
+            # Only store when a new low is reached; most ticks just compare
+            if pnl_percent < trade['max_neg_pnl_pct']:
+                trade['max_neg_pnl_pct'] = pnl_percent
+            if pnl_usdt < trade['max_neg_pnl_usdt']:
+                trade['max_neg_pnl_usdt'] = pnl_usdt
+            if current_rsi < trade['max_neg_rsi']:
+                trade['max_neg_rsi'] = current_rsi
 
 
     def add_alert_log(self, symbol, message):
-        with self.lock:
-            self.alert_log.insert(0, {"time": datetime.now().strftime('%H:%M:%S'), "symbol": symbol, "rsi": message})
-            self.alert_log = self.alert_log[:50]
+        with self._alert_log_lock:
+            self.alert_log.appendleft({"time": self._alert_time_string(), "symbol": symbol, "rsi": message})
+
+    def _alert_time_string(self):
+        """Returns the current 'HH:MM:SS' string, formatted at most once per second."""
+        second = int(time.time())
+        if self._alert_time_cache[0] != second:
+            self._alert_time_cache = (second, time.strftime('%H:%M:%S', time.localtime(second)))
+        return self._alert_time_cache[1]
+
+    def get_recent_alerts(self, limit=20):
+        with self._alert_log_lock:
+            return list(itertools.islice(self.alert_log, limit))
 
     def set_rsi_status(self, status, message, current_coin=None):
         with self.lock:
@@ -271,10 +417,18 @@ class StateManager:
                 self.controls['trade_execution_enabled'].clear()
                 self.event_bus.publish('GLOBAL_PAUSE_TRIGGERED', {'loss_count': loss_count})
                 print(f"--- !!! GLOBAL PAUSE ACTIVATED due to {loss_count} losses. Trading paused for {config.GLOBAL_PAUSE_DURATION_HOURS} hours. !!! ---")
-                threading.Timer(config.GLOBAL_PAUSE_DURATION_HOURS * 3600, self.lift_global_pause).start()
+                # Lifted by the FileManager flush thread via check_global_pause_expiry() instead of parking a Timer thread for hours
+                self._pause_expiry = time.time() + config.GLOBAL_PAUSE_DURATION_HOURS * 3600
+
+    def check_global_pause_expiry(self):
+        """Lifts the global pause once its expiry has passed. Safe to call at any cadence."""
+        expiry = self._pause_expiry
+        if expiry is not None and time.time() >= expiry:
+            self.lift_global_pause()
 
     def lift_global_pause(self):
         with self.lock:
+            self._pause_expiry = None
             if self.controls['global_pause_active'].is_set():
                 self.controls['global_pause_active'].clear()
                 self.event_bus.publish('GLOBAL_PAUSE_LIFTED')
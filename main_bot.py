@@ -1,5 +1,4 @@
 import atexit
-import threading
 import time
 import os
 import config
@@ -39,17 +38,23 @@ file_manager.load_all()
 db_manager.load_state_from_database() # This now only loads paper trades
 
 atexit.register(file_manager.save_all_on_exit)
+atexit.register(event_bus.shutdown)
+# Flushes queued writes, runs PRAGMA optimize and closes the pooled connections
+atexit.register(db_manager.close)
 
 # Keep references to services that need to be passed to the web app
 websocket_service = WebSocketService(state_manager, event_bus)
 # The TradingService now handles its own initial sync (balance + positions)
 trading_service = TradingService(state_manager, event_bus, db_manager)
+email_service = EmailService(state_manager, event_bus)
+# Quits the persistent SMTP session
+atexit.register(email_service.close)
 
 services = [
     websocket_service,
     RsiService(state_manager, event_bus),
     trading_service, # Use the instance
-    EmailService(state_manager, event_bus)
+    email_service
 ]
 
 # --- Create the Flask app instance ---
@@ -59,8 +64,7 @@ app = create_flask_app(state_manager, db_manager, websocket_service, trading_ser
 def main():
     """The main entry point for the application."""
     
-    event_bus_thread = threading.Thread(target=event_bus.process_events, daemon=True)
-    event_bus_thread.start()
+    event_bus.start()
     
     for service in services:
         service.start()
@@ -3,36 +3,295 @@ import sqlite3
 import os
 import json
 import time
-from datetime import datetime, timedelta
+import itertools
+import functools
+import queue
+from urllib.request import pathname2url
+from datetime import datetime
 import threading
 import config
 
+# Per-connection tuning; journal_mode=WAL is persistent and is set once in _initialize_db
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-64000;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA busy_timeout=5000;",
+)
+READ_POOL_SIZE = 3
+# Event-driven writes are committed together: up to WRITE_BATCH_MAX statements or WRITE_BATCH_SECONDS of waiting
+WRITE_BATCH_MAX = 64
+WRITE_BATCH_SECONDS = 0.05
+# The alert counter lives in memory and is written to ALERT_COUNTER_FILE every N allocations and at exit,
+# as a fixed-width record rewritten in place through a file descriptor kept open for the whole run.
+# The number is space-padded inside the original JSON object, so the file stays valid JSON for older builds.
+ALERT_COUNTER_FLUSH_EVERY = 16
+ALERT_COUNTER_WIDTH = 20
+ALERT_COUNTER_RECORD = '{"last_alert_number":%' + str(ALERT_COUNTER_WIDTH) + 'd}'
+ALERT_COUNTER_RECORD_SIZE = len(ALERT_COUNTER_RECORD % 0)
+# WAL checkpoints and planner statistics are handled by a background tick instead of on the write path
+MAINTENANCE_INTERVAL_SECONDS = 15 * 60
+WAL_AUTOCHECKPOINT_PAGES = 10000
+
+# Columns written when a trade or cooldown log row is first inserted; new rows store only the epoch timestamp
+TRADE_OPEN_COLUMNS = (
+    'Alert_id', 'Timestamp_ts', 'Symbol', 'Type', 'Status', 'Entry_Price', 'Entry_RSI',
+    'Trade_Amount', 'Leverage', 'Leveraged_Amount', 'Change_24h_pct', 'Source'
+)
+COOLDOWN_LOG_COLUMNS = (
+    'Alert_id', 'Timestamp_ts', 'Symbol', 'Type', 'Status', 'Reason', 'Entry_RSI', 'Cooldown_Trigger_Value', 'Source'
+)
+
+# Display format of the legacy Timestamp/Exit_Time text columns
+TIMESTAMP_FORMAT = '%d-%m-%Y -> %I:%M:%S %p'
+
+def format_timestamp(ts):
+    """Formats an epoch timestamp as 'DD-MM-YYYY -> HH:MM:SS AM/PM' via time.strftime, skipping datetime construction."""
+    return time.strftime(TIMESTAMP_FORMAT, time.localtime(ts))
+
+@functools.lru_cache(maxsize=None)
+def _insert_sql(table, cols):
+    """Builds the INSERT for a (table, columns) pair once. OR IGNORE lets the Alert_id primary key skip duplicates."""
+    return f"INSERT OR IGNORE INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+
+def parse_timestamp_series(series):
+    """Parses legacy 'DD-MM-YYYY -> HH:MM:SS AM/PM' (or ISO 8601) timestamp strings; unparseable values become NaT."""
+    parsed = pd.to_datetime(series, format=TIMESTAMP_FORMAT, errors='coerce', cache=True)
+    missing = parsed.isna() & series.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(series[missing], format='ISO8601', errors='coerce', cache=True)
+    return parsed
+
+# Lock ordering: state.lock < db_lock. Event handlers touch only state.lock and hand SQL to the writer queue,
+# so db_lock is never waited on from an event thread. _alert_lock and the read-pool locks are leaves.
 class DatabaseManager:
     """Handles all read/write operations for the trade database (SQLite file)."""
+    # Stored in PRAGMA user_version; bump when the trades table needs another migration step
+    SCHEMA_VERSION = 3
+
     def __init__(self, state_manager, event_bus):
         self.state = state_manager
         self.event_bus = event_bus
+        # Reentrant: reset_database re-runs _initialize_db and the batch fallback re-enters _execute_query
         self.db_lock = threading.RLock()
+        self._alert_lock = threading.Lock()
         self.db_path = config.DATABASE_FILE
         self.cooldown_db_path = config.COOLDOWN_DATABASE_FILE # <-- NEW
         self.table_name = 'trades'
         self.cooldown_table_name = 'cooldowns' # <-- NEW
+        # One persistent write connection per database file, used by the db-writer thread and
+        # startup/maintenance code under db_lock
+        self._connections = {}
+        # Read-only connections per database file, each with its own lock, so reads never take db_lock
+        self._read_pools = {}
+        self._read_cycles = {}
+        # db_path -> counter bumped after every committed write, so readers can cache derived views
+        self._data_versions = {}
         self._initialize_db()
+        self._open_read_pool()
+        self._alert_fd = None
+        self._last_alert_num = self._load_alert_counter()
+        self._unsaved_alert_numbers = 0
+        # Background writer that coalesces event-handler writes into one transaction per batch
+        self._write_queue = queue.SimpleQueue()
+        threading.Thread(target=self._writer_loop, name="db-writer", daemon=True).start()
+        threading.Thread(target=self._maintenance_loop, name="db-maintenance", daemon=True).start()
         self._subscribe_to_events()
 
     def get_open_db_trades(self):
-        """Fetches all trades marked as 'Open' from the database."""
-        df = self._read_db_to_df(f"SELECT * FROM {self.table_name} WHERE Status = 'Open'")
-        if df.empty:
-            return {}
-        # Convert to a dictionary keyed by symbol for easy lookup
-        return df.set_index('Symbol').to_dict('index')
+        """Fetches all trades marked as 'Open' from the database, keyed by symbol."""
+        cursor_rows = self._read_rows(
+            f"SELECT Symbol, Alert_id, Trade_Amount, Entry_RSI FROM {self.table_name} WHERE Status = 'Open'"
+        )
+        # Plain cursor tuples, so no DataFrame is built just to be turned back into dicts
+        return {
+            symbol: {'Alert_id': alert_id, 'Trade_Amount': trade_amount, 'Entry_RSI': entry_rsi}
+            for symbol, alert_id, trade_amount, entry_rsi in cursor_rows
+        }
 
     def _format_datetime(self, dt_obj):
-        """Formats a datetime object into 'DD-MM-YYYY -> HH:MM:SS AM/PM'."""
+        """Formats an epoch timestamp or datetime object into 'DD-MM-YYYY -> HH:MM:SS AM/PM'."""
+        if isinstance(dt_obj, (int, float)):
+            return format_timestamp(dt_obj)
         if not isinstance(dt_obj, datetime):
             return None
-        return dt_obj.strftime('%d-%m-%Y -> %I:%M:%S %p')
+        return dt_obj.strftime(TIMESTAMP_FORMAT)
+
+    def _connect(self, db_path, read_only=False):
+        """Opens a connection with the tuning PRAGMAs applied."""
+        if read_only:
+            uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _get_conn(self, db_path):
+        """Returns the persistent connection for a database, opening it on first use. Call under db_lock."""
+        conn = self._connections.get(db_path)
+        if conn is None:
+            conn = self._connections[db_path] = self._connect(db_path)
+        return conn
+
+    def _open_read_pool(self):
+        """Opens a small round-robin pool of read-only connections to each database."""
+        for db_path in (self.db_path, self.cooldown_db_path):
+            if db_path == ':memory:':
+                continue
+            try:
+                pool = [(self._connect(db_path, read_only=True), threading.Lock()) for _ in range(READ_POOL_SIZE)]
+                self._read_pools[db_path] = pool
+                self._read_cycles[db_path] = itertools.cycle(pool)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not open read-only connections to {db_path}, reads will share the writer. Error: {e}")
+
+    def data_version(self, db_path=None):
+        """Returns a value that changes whenever a write to the database is committed."""
+        return self._data_versions.get(db_path or self.db_path, 0)
+
+    def _bump_data_version(self, db_path):
+        """Call under db_lock after a commit."""
+        self._data_versions[db_path] = self._data_versions.get(db_path, 0) + 1
+
+    def _reader(self, db_path=None):
+        """Returns a (connection, lock) pair for a read; WAL lets these run alongside the writer."""
+        db_path = db_path or self.db_path
+        cycle = self._read_cycles.get(db_path)
+        if cycle is not None:
+            return next(cycle)
+        return self._get_conn(db_path), self.db_lock
+
+    def close(self):
+        """Flushes pending writes, optimizes and closes every pooled connection."""
+        self.save_alert_counter()
+        if self._alert_fd is not None:
+            os.close(self._alert_fd)
+            self._alert_fd = None
+        self.flush_writes()
+        self.optimize()
+        self._close_connections()
+
+    def _close_connections(self):
+        with self.db_lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            for pool in self._read_pools.values():
+                for conn, lock in pool:
+                    with lock:
+                        try:
+                            conn.close()
+                        except sqlite3.Error:
+                            pass
+            self._connections.clear()
+            self._read_pools, self._read_cycles = {}, {}
+
+    def reset_database(self):
+        """Deletes both database files (with their WAL side files) and recreates empty ones."""
+        self.flush_writes()
+        with self.db_lock:
+            self._close_connections()
+            for db_path in (self.db_path, self.cooldown_db_path):
+                for path in (db_path, db_path + '-wal', db_path + '-shm'):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self._initialize_db()
+            self._open_read_pool()
+            for db_path in (self.db_path, self.cooldown_db_path):
+                self._bump_data_version(db_path)
+
+    def _enqueue_write(self, query, params=(), db_path=None):
+        """Queues a write for the background writer instead of committing it on the caller's thread."""
+        self._write_queue.put((query, params, db_path or self.db_path))
+
+    def flush_writes(self, timeout=5):
+        """Blocks until every write queued so far has been committed."""
+        done = threading.Event()
+        self._write_queue.put((None, done, None))
+        if not done.wait(timeout):
+            print("Warning: Timed out waiting for queued database writes to flush.")
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + WRITE_BATCH_SECONDS
+            while len(batch) < WRITE_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._commit_batch([item for item in batch if item[0] is not None])
+            except Exception as e:
+                print(f"🚨 Error in database writer: {e}")
+            for query, marker, _ in batch:
+                if query is None:
+                    marker.set()
+
+    def _commit_batch(self, batch):
+        """Commits a batch with one transaction per database, keeping statement order."""
+        by_db = {}
+        for query, params, db_path in batch:
+            runs = by_db.setdefault(db_path, [])
+            # Only consecutive identical statements are grouped, so INSERT/UPDATE/DELETE order is preserved
+            if runs and runs[-1][0] == query:
+                runs[-1][1].append(params)
+            else:
+                runs.append((query, [params]))
+
+        with self.db_lock:
+            for db_path, runs in by_db.items():
+                conn = self._get_conn(db_path)
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for query, params_list in runs:
+                        conn.executemany(query, params_list)
+                    conn.commit()
+                    self._bump_data_version(db_path)
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    print(f"Warning: Batched write failed ({e}), retrying statements one by one.")
+                    for query, params_list in runs:
+                        for params in params_list:
+                            self._execute_query(query, params, db_path=db_path)
+
+    def _enable_wal(self, conn, db_path):
+        """Switches the database to WAL so readers no longer block on writers."""
+        if db_path == ':memory:':
+            return
+        mode = conn.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+        if str(mode).lower() != 'wal':
+            print(f"Warning: SQLite refused WAL mode for {db_path} (journal_mode={mode}).")
+            return
+        # Commits rarely checkpoint inline; the maintenance tick truncates the WAL instead
+        conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES};")
+
+    def optimize(self):
+        """Runs PRAGMA optimize on both databases so the query planner statistics stay fresh."""
+        for db_path in (self.db_path, self.cooldown_db_path):
+            self._execute_query("PRAGMA optimize;", db_path=db_path)
+
+    def run_maintenance(self):
+        """Checkpoints and truncates the WAL, then refreshes planner statistics, on both databases."""
+        for db_path in (self.db_path, self.cooldown_db_path):
+            self._execute_query("PRAGMA wal_checkpoint(TRUNCATE);", db_path=db_path)
+            self._execute_query("PRAGMA optimize;", db_path=db_path)
+
+    def _maintenance_loop(self):
+        while True:
+            time.sleep(MAINTENANCE_INTERVAL_SECONDS)
+            try:
+                self.run_maintenance()
+            except Exception as e:
+                print(f"🚨 Error during database maintenance: {e}")
 
     def _initialize_db(self):
         """Ensures the database files and tables exist."""
@@ -40,9 +299,9 @@ class DatabaseManager:
         
         # Initialize main trade database
         with self.db_lock:
-            conn = None
             try:
-                conn = sqlite3.connect(self.db_path)
+                conn = self._get_conn(self.db_path)
+                self._enable_wal(conn, self.db_path)
                 cursor = conn.cursor()
                 
                 create_table_sql = f"""
@@ -52,23 +311,30 @@ class DatabaseManager:
                     Entry_RSI REAL, Exit_RSI REAL, Trade_Amount REAL, Leverage INTEGER,
                     Leveraged_Amount REAL, Change_24h_pct REAL, Source TEXT, Exit_Time TEXT,
                     Trade_Duration_Hours REAL, Cooldown_Trigger_Value REAL, max_neg_pnl_pct REAL,
-                    max_neg_pnl_usdt REAL, max_neg_rsi REAL
+                    max_neg_pnl_usdt REAL, max_neg_rsi REAL, Timestamp_ts REAL
                 );
                 """
                 cursor.execute(create_table_sql)
-                self._add_missing_columns(cursor, self.table_name)
+                # An up-to-date schema costs a single integer read; migrations only run on older files
+                schema_version = cursor.execute("PRAGMA user_version;").fetchone()[0]
+                if schema_version < self.SCHEMA_VERSION:
+                    self._add_missing_columns(cursor, self.table_name)
+                    self._backfill_timestamp_ts(cursor)
+                    # Epoch copy of Timestamp so time-window queries can use an index
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_trades_ts ON {self.table_name}(Timestamp_ts);")
+                    # Serves the open-trade lookups at startup and in get_open_db_trades
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_trades_status_source ON {self.table_name}(Status, Source);")
+                    cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION};")
                 conn.commit()
                 print(f"--- SQLite database initialized: {self.db_path} ---")
             except sqlite3.Error as e:
                 print(f"🚨 CRITICAL: SQLite error during initialization: {e}")
-            finally:
-                if conn: conn.close()
 
         # Initialize cooldown database
         with self.db_lock:
-            conn = None
             try:
-                conn = sqlite3.connect(self.cooldown_db_path)
+                conn = self._get_conn(self.cooldown_db_path)
+                self._enable_wal(conn, self.cooldown_db_path)
                 cursor = conn.cursor()
                 create_cooldown_table_sql = f"""
                 CREATE TABLE IF NOT EXISTS {self.cooldown_table_name} (
@@ -83,8 +349,6 @@ class DatabaseManager:
                 print(f"--- Cooldown database initialized: {self.cooldown_db_path} ---")
             except sqlite3.Error as e:
                 print(f"🚨 CRITICAL: Cooldown DB error during initialization: {e}")
-            finally:
-                if conn: conn.close()
 
 
     def _add_missing_columns(self, cursor, table_name):
@@ -95,7 +359,8 @@ class DatabaseManager:
             
             new_columns = {
                 'Exit_Time': 'TEXT', 'Trade_Duration_Hours': 'REAL', 'Cooldown_Trigger_Value': 'REAL',
-                'max_neg_pnl_pct': 'REAL', 'max_neg_pnl_usdt': 'REAL', 'max_neg_rsi': 'REAL'
+                'max_neg_pnl_pct': 'REAL', 'max_neg_pnl_usdt': 'REAL', 'max_neg_rsi': 'REAL',
+                'Timestamp_ts': 'REAL'
             }
             
             for col_name, col_type in new_columns.items():
@@ -107,35 +372,56 @@ class DatabaseManager:
             print(f"Warning: Could not add missing columns. Error: {e}")
 
 
+    def _backfill_timestamp_ts(self, cursor):
+        """Fills Timestamp_ts for rows written before the column existed (new rows no longer write Timestamp)."""
+        try:
+            rows = cursor.execute(f"SELECT Alert_id, Timestamp FROM {self.table_name} WHERE Timestamp_ts IS NULL AND Timestamp IS NOT NULL").fetchall()
+            if not rows: return
+            parsed = parse_timestamp_series(pd.Series([timestamp for _, timestamp in rows], dtype=object))
+            updates = [(dt.timestamp(), alert_id) for (alert_id, _), dt in zip(rows, parsed) if pd.notna(dt)]
+            if updates:
+                cursor.executemany(f"UPDATE {self.table_name} SET Timestamp_ts = ? WHERE Alert_id = ?", updates)
+                print(f"--- Backfilled Timestamp_ts for {len(updates)} trade(s). ---")
+        except sqlite3.Error as e:
+            print(f"Warning: Could not backfill Timestamp_ts. Error: {e}")
+
     def _execute_query(self, query, params=(), fetch_one=False, fetch_all=False, db_path=None):
         """Helper to execute a query with thread safety."""
         with self.db_lock:
             conn = None
             try:
-                conn = sqlite3.connect(db_path or self.db_path)
+                conn = self._get_conn(db_path or self.db_path)
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 conn.commit()
+                if not (fetch_one or fetch_all):
+                    self._bump_data_version(db_path or self.db_path)
                 if fetch_one: return cursor.fetchone()
                 if fetch_all: return cursor.fetchall()
             except sqlite3.Error as e:
                 print(f"🚨 SQLite Error: {e} in query: {query}")
+                if conn: conn.rollback()
                 return None
-            finally:
-                if conn: conn.close()
 
     def _read_db_to_df(self, query, db_path=None):
         """Helper to read the database into a pandas DataFrame."""
-        with self.db_lock:
-            conn = None
+        conn, lock = self._reader(db_path)
+        with lock:
             try:
-                conn = sqlite3.connect(db_path or self.db_path)
                 return pd.read_sql_query(query, conn)
             except (pd.io.sql.DatabaseError, sqlite3.Error) as e:
                 print(f"--- Could not read from database: {e} ---")
                 return pd.DataFrame()
-            finally:
-                if conn: conn.close()
+
+    def _read_rows(self, query, params=(), db_path=None):
+        """Helper to fetch plain row tuples, without building a DataFrame."""
+        conn, lock = self._reader(db_path)
+        with lock:
+            try:
+                return conn.execute(query, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"--- Could not read from database: {e} ---")
+                return []
 
     def _subscribe_to_events(self):
         self.event_bus.subscribe('TRADE_OPENED', self.handle_trade_opened)
@@ -148,89 +434,114 @@ class DatabaseManager:
         """Restores open PAPER trades and the cooldown list from the databases at startup."""
         print("--- Loading state from database... ---")
         
-        # Load Paper Trades
+        # Load Paper Trades (queried before taking state.lock, which only guards the dict updates)
+        # Only open paper trades are needed, so filter in SQL; Timestamp_ts is the stored epoch (backfilled for legacy rows)
+        rows = self._read_rows(
+            f"SELECT Alert_id, Symbol, Entry_Price, Entry_RSI, Trade_Amount, Leverage, Source, Timestamp_ts FROM {self.table_name} "
+            "WHERE Status = 'Open' AND (Source IS NULL OR Source != 'Live') AND Timestamp_ts IS NOT NULL AND Entry_Price IS NOT NULL"
+        )
         with self.state.lock:
             try:
-                df = self._read_db_to_df(f"SELECT * FROM {self.table_name}")
-                if not df.empty:
-                    def parse_custom_date(date_str):
-                        if not date_str or not isinstance(date_str, str): return None
-                        try: return datetime.strptime(date_str, '%d-%m-%Y -> %I:%M:%S %p')
-                        except ValueError:
-                            try: return datetime.fromisoformat(date_str)
-                            except (ValueError, TypeError): return None
-                    df['Timestamp_dt'] = df['Timestamp'].apply(parse_custom_date)
-                    open_paper_trades_df = df[(df['Status'] == 'Open') & (df['Source'] != 'Live')]
-                    for _, row in open_paper_trades_df.iterrows():
-                        symbol = row['Symbol']
-                        timestamp_dt = row['Timestamp_dt']
-                        if timestamp_dt:
-                            self.state.active_trades[symbol] = {
-                                'alert_num': row['Alert_id'], 'entry_price': float(row['Entry_Price']),
-                                'entry_time': timestamp_dt.timestamp(), 'entry_rsi': row.get('Entry_RSI'),
-                                'trade_amount': row.get('Trade_Amount', config.TRADE_AMOUNT_FIXED_USDT),
-                                'leverage': row.get('Leverage', config.LEVERAGE), 'pnl_percent': 0, 'pnl_usdt': 0,
-                                'source': row.get('Source', 'Bot'), 'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0,
-                                'max_neg_rsi': row.get('Entry_RSI', 0)
-                            }
-                    print(f"--- Restored {len(self.state.active_trades)} open paper trade(s). ---")
+                for alert_id, symbol, entry_price, entry_rsi, trade_amount, leverage, source, entry_time in rows:
+                    self.state.add_active_trade(symbol, {
+                        'alert_num': alert_id, 'entry_price': float(entry_price),
+                        'entry_time': entry_time, 'entry_rsi': entry_rsi,
+                        'trade_amount': trade_amount, 'leverage': leverage, 'pnl_percent': 0, 'pnl_usdt': 0,
+                        'source': source or 'Bot', 'max_neg_pnl_pct': 0, 'max_neg_pnl_usdt': 0,
+                        'max_neg_rsi': entry_rsi if type(entry_rsi) is float else 0
+                    })
+                print(f"--- Restored {len(self.state.active_trades)} open paper trade(s). ---")
             except Exception as e:
                 print(f"🚨 CRITICAL: Failed to load paper trades from database. Error: {e}")
 
         # Load Cooldown List
+        rows = self._read_rows(
+            f"SELECT symbol, reason, exit_date FROM {self.cooldown_table_name} WHERE exit_date > ?",
+            (time.time(),), db_path=self.cooldown_db_path
+        )
         with self.state.lock:
             try:
-                df_cooldown = self._read_db_to_df(f"SELECT * FROM {self.cooldown_table_name}", db_path=self.cooldown_db_path)
-                now = time.time()
-                active_cooldowns = df_cooldown[df_cooldown['exit_date'] > now]
-                
                 self.state.cooldowned_coins = {
-                    row['symbol']: {'reason': row['reason'], 'end_time': row['exit_date']}
-                    for _, row in active_cooldowns.iterrows()
+                    symbol: {'reason': reason, 'end_time': exit_date}
+                    for symbol, reason, exit_date in rows
                 }
                 print(f"--- Restored {len(self.state.cooldowned_coins)} active cooldown(s). ---")
             except Exception as e:
                 print(f"🚨 CRITICAL: Failed to load cooldowns from database. Error: {e}")
 
 
-    def get_next_alert_number(self):
-        with self.db_lock:
-            alert_num = 0
-            try:
-                if os.path.exists(config.ALERT_COUNTER_FILE):
-                    with open(config.ALERT_COUNTER_FILE, 'r') as f: data = json.load(f)
-                    alert_num = data.get('last_alert_number', 0)
-                else:
-                    result = self._execute_query(f"SELECT MAX(Alert_id) FROM {self.table_name}", fetch_one=True)
-                    if result and result[0] is not None: alert_num = result[0]
-            except (IOError, json.JSONDecodeError, sqlite3.Error) as e:
-                print(f"Warning: Failed to read alert number, defaulting to 0. Error: {e}")
-                alert_num = 0
-            next_alert_num = alert_num + 1
+    def _load_alert_counter(self):
+        """Opens the alert counter file once and reads the last used alert number."""
+        alert_num = 0
+        try:
+            self._alert_fd = os.open(config.ALERT_COUNTER_FILE, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            raw = self._read_alert_fd().decode().strip()
+            if raw.startswith('{'):
+                alert_num = json.loads(raw).get('last_alert_number', 0)
+            elif raw:
+                # Bare zero-padded integer written by an interim build
+                alert_num = int(raw)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Failed to read alert number, defaulting to 0. Error: {e}")
+        # The file is saved lazily, so never hand out a number the database already holds
+        result = self._read_rows(f"SELECT MAX(Alert_id) FROM {self.table_name}")
+        if result and result[0][0] is not None: alert_num = max(alert_num, result[0][0])
+        alert_num = int(alert_num)
+        if self._alert_fd is not None:
             try:
-                with open(config.ALERT_COUNTER_FILE, 'w') as f: json.dump({'last_alert_number': next_alert_num}, f)
-            except IOError as e:
+                # Rewrite once in the fixed-width format (this also drops any longer legacy tail)
+                self._write_alert_fd(alert_num)
+                os.ftruncate(self._alert_fd, ALERT_COUNTER_RECORD_SIZE)
+            except OSError as e:
                 print(f"🚨 CRITICAL: Could not write to alert counter file! {e}")
-            return int(next_alert_num)
+        return alert_num
+
+    def _read_alert_fd(self):
+        if hasattr(os, 'pread'):
+            return os.pread(self._alert_fd, 256, 0)
+        os.lseek(self._alert_fd, 0, os.SEEK_SET)
+        return os.read(self._alert_fd, 256)
+
+    def _write_alert_fd(self, alert_num):
+        data = (ALERT_COUNTER_RECORD % alert_num).encode()
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self._alert_fd, data, 0)
+        else:
+            os.lseek(self._alert_fd, 0, os.SEEK_SET)
+            os.write(self._alert_fd, data)
+
+    def save_alert_counter(self):
+        """Writes the in-memory alert counter to ALERT_COUNTER_FILE in place."""
+        with self._alert_lock:
+            self._save_alert_counter_locked()
+
+    def _save_alert_counter_locked(self):
+        if self._alert_fd is None: return
+        try:
+            self._write_alert_fd(self._last_alert_num)
+            self._unsaved_alert_numbers = 0
+        except OSError as e:
+            print(f"🚨 CRITICAL: Could not write to alert counter file! {e}")
+
+    def get_next_alert_number(self):
+        # Own lock, so allocating a number never waits behind a writer commit on db_lock
+        with self._alert_lock:
+            self._last_alert_num += 1
+            next_alert_num = self._last_alert_num
+            self._unsaved_alert_numbers += 1
+            if self._unsaved_alert_numbers >= ALERT_COUNTER_FLUSH_EVERY:
+                self._save_alert_counter_locked()
+            return next_alert_num
 
     def handle_trade_opened(self, trade_data):
-        with self.db_lock:
-            symbol = next((s for s, t in self.state.active_trades.items() if t['alert_num'] == trade_data['alert_num']), None)
-            if not symbol: return
-            with self.state.lock: coin_details = self.state.coin_data.get(symbol, {})
-            exists = self._execute_query(f"SELECT 1 FROM {self.table_name} WHERE Alert_id = ?", (trade_data['alert_num'],), fetch_one=True)
-            if exists:
-                print(f"--- DB: Trade Alert #{trade_data['alert_num']} already exists. Skipping write. ---")
-                return
-            db_entry = {
-                'Alert_id': trade_data['alert_num'], 'Timestamp': self._format_datetime(datetime.now()),
-                'Symbol': symbol, 'Type': 'SHORT', 'Status': 'Open', 'Reason': None,
-                'Entry_Price': trade_data['entry_price'], 'Exit_Price': None, 'PNL_pct': None, 'PNL_USDT': None,
-                'Entry_RSI': trade_data['entry_rsi'], 'Exit_RSI': None, 'Trade_Amount': trade_data['trade_amount'], 
-                'Leverage': trade_data['leverage'], 'Leveraged_Amount': trade_data['trade_amount'] * trade_data['leverage'],
-                'Change_24h_pct': coin_details.get('change_24h', 0), 'Source': trade_data['source']
-            }
-            self._write_df_to_db(pd.DataFrame([db_entry]), self.table_name, self.db_path)
+        symbol = self.state.active_trades_by_alert.get(trade_data['alert_num'])
+        if not symbol: return
+        coin_details = self.state.coin_data.get(symbol, {})
+        self._insert_row(self.table_name, TRADE_OPEN_COLUMNS, (
+            trade_data['alert_num'], time.time(), symbol, 'SHORT', 'Open',
+            trade_data['entry_price'], trade_data['entry_rsi'], trade_data['trade_amount'], trade_data['leverage'],
+            trade_data['trade_amount'] * trade_data['leverage'], coin_details.get('change_24h', 0), trade_data['source']
+        ))
 
     def handle_trade_closed(self, close_data):
         """Updates a trade's status to 'Closed' in the database."""
@@ -247,14 +558,10 @@ class DatabaseManager:
 
     def handle_cooldown_log(self, log_data):
         """Writes a new 'Closed' entry specifically for a cooldown event."""
-        with self.db_lock:
-            db_entry = {
-                'Alert_id': self.get_next_alert_number(), 'Timestamp': self._format_datetime(datetime.now()),
-                'Symbol': log_data['symbol'], 'Type': 'SHORT', 'Status': 'Closed',
-                'Reason': log_data['reason'], 'Entry_RSI': log_data['rsi'],
-                'Cooldown_Trigger_Value': log_data.get('pullback_percent'), 'Source': 'Bot'
-            }
-            self._write_df_to_db(pd.DataFrame([db_entry]), self.table_name, self.db_path)
+        self._insert_row(self.table_name, COOLDOWN_LOG_COLUMNS, (
+            self.get_next_alert_number(), time.time(), log_data['symbol'], 'SHORT', 'Closed',
+            log_data['reason'], log_data['rsi'], log_data.get('pullback_percent'), 'Bot'
+        ))
 
     def handle_add_to_cooldown(self, data):
         """Adds or updates a coin in the cooldown database."""
@@ -272,7 +579,7 @@ class DatabaseManager:
         reason = excluded.reason;
         """
         params = (symbol, entry_time, end_time, reason)
-        self._execute_query(query, params, db_path=self.cooldown_db_path)
+        self._enqueue_write(query, params, db_path=self.cooldown_db_path)
         print(f"--- Added/Updated {symbol} in cooldown database. Reason: {reason} ---")
 
     def handle_remove_from_cooldown(self, data):
@@ -283,73 +590,51 @@ class DatabaseManager:
                 del self.state.cooldowned_coins[symbol]
         
         query = f"DELETE FROM {self.cooldown_table_name} WHERE symbol = ?"
-        self._execute_query(query, (symbol,), db_path=self.cooldown_db_path)
+        self._enqueue_write(query, (symbol,), db_path=self.cooldown_db_path)
         print(f"--- Removed {symbol} from cooldown database. ---")
 
-    def _write_df_to_db(self, df, table_name, db_path):
-        """Appends a DataFrame to the database with thread safety."""
-        with self.db_lock:
-            conn = None
-            try:
-                conn = sqlite3.connect(db_path)
-                df.to_sql(table_name, conn, if_exists='append', index=False)
-            except sqlite3.Error as e:
-                print(f"🚨 CRITICAL: Could not write to database! Error: {e}")
-            finally:
-                if conn: conn.close()
+    def _insert_row(self, table, cols, values, db_path=None):
+        """Queues a single-row INSERT for a known column tuple, bypassing pandas' to_sql reflection."""
+        self._enqueue_write(_insert_sql(table, cols), values, db_path=db_path)
 
     def _update_trade_in_db(self, alert_num, new_status, reason, pnl_percent, pnl_usdt, close_price, exit_rsi, entry_time=None, max_neg_pnl_pct=None, max_neg_pnl_usdt=None, max_neg_rsi=None):
         """Updates a single trade record in the database."""
-        with self.db_lock:
-            exit_time_dt = datetime.now()
-            exit_time_str = self._format_datetime(exit_time_dt)
-            
-            trade_duration_hours = None
-            if entry_time:
-                try:
-                    duration_seconds = exit_time_dt.timestamp() - entry_time
-                    trade_duration_hours = duration_seconds / 3600
-                except (TypeError, ValueError) as e:
-                    print(f"Warning: Could not calculate trade duration for Alert #{alert_num}. Error: {e}")
-                    trade_duration_hours = None
-
-            update_query = f"""
-            UPDATE {self.table_name}
-            SET Status = ?, Reason = ?, PNL_pct = ?, PNL_USDT = ?, Exit_Price = ?, Exit_RSI = ?,
-                Exit_Time = ?, Trade_Duration_Hours = ?, max_neg_pnl_pct = ?, max_neg_pnl_usdt = ?, max_neg_rsi = ?
-            WHERE Alert_id = ?
-            """
-            params = (
-                new_status, reason, pnl_percent, pnl_usdt, close_price, exit_rsi,
-                exit_time_str, trade_duration_hours, max_neg_pnl_pct, max_neg_pnl_usdt, max_neg_rsi,
-                alert_num
-            )
-            self._execute_query(update_query, params)
-            print(f"--- Updated trade Alert #{alert_num} to {new_status} in database. ---")
+        exit_time = time.time()
+        exit_time_str = format_timestamp(exit_time)
+        
+        trade_duration_hours = None
+        if entry_time:
+            try:
+                duration_seconds = exit_time - entry_time
+                trade_duration_hours = duration_seconds / 3600
+            except (TypeError, ValueError) as e:
+                print(f"Warning: Could not calculate trade duration for Alert #{alert_num}. Error: {e}")
+                trade_duration_hours = None
+
+        update_query = f"""
+        UPDATE {self.table_name}
+        SET Status = ?, Reason = ?, PNL_pct = ?, PNL_USDT = ?, Exit_Price = ?, Exit_RSI = ?,
+            Exit_Time = ?, Trade_Duration_Hours = ?, max_neg_pnl_pct = ?, max_neg_pnl_usdt = ?, max_neg_rsi = ?
+        WHERE Alert_id = ?
+        """
+        params = (
+            new_status, reason, pnl_percent, pnl_usdt, close_price, exit_rsi,
+            exit_time_str, trade_duration_hours, max_neg_pnl_pct, max_neg_pnl_usdt, max_neg_rsi,
+            alert_num
+        )
+        self._enqueue_write(update_query, params)
+        print(f"--- Updated trade Alert #{alert_num} to {new_status} in database. ---")
 
     def check_for_global_pause(self):
         """Checks recent trades and triggers a global pause if loss limit is hit."""
-        with self.db_lock:
-            try:
-                df = self._read_db_to_df()
-                if df.empty: return
-
-                def parse_custom_date(date_str):
-                    if not date_str or not isinstance(date_str, str): return None
-                    try: return datetime.strptime(date_str, '%d-%m-%Y -> %I:%M:%S %p')
-                    except ValueError:
-                        try: return datetime.fromisoformat(date_str)
-                        except (ValueError, TypeError): return None
-                
-                df['Timestamp_dt'] = df['Timestamp'].apply(parse_custom_date)
-                
-                twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
-                recent_trades = df[df['Timestamp_dt'] > twenty_four_hours_ago]
-                
-                pnl_series = pd.to_numeric(recent_trades['PNL_USDT'], errors='coerce')
-                loss_trades = pnl_series[pnl_series < 0]
-                
-                if len(loss_trades) >= config.LOSS_TRADES_LIMIT_24H:
-                    self.state.activate_global_pause(len(loss_trades))
-            except Exception as e:
-                print(f"🚨 Error checking for global pause: {e}")
+        try:
+            # Text values such as 'N/A' never compare below 0 in SQLite, matching the old numeric coercion
+            result = self._read_rows(
+                f"SELECT COUNT(*) FROM {self.table_name} WHERE Timestamp_ts > ? AND PNL_USDT < 0",
+                (time.time() - 86400,)
+            )
+            loss_count = result[0][0] if result else 0
+            if loss_count >= config.LOSS_TRADES_LIMIT_24H:
+                self.state.activate_global_pause(loss_count)
+        except Exception as e:
+            print(f"🚨 Error checking for global pause: {e}")
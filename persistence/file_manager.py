@@ -1,21 +1,63 @@
 import json
 import os
+import pickle
+import tempfile
 from datetime import timedelta
 import time
+import threading
 import config
 
 class FileManager:
     """Handles loading and saving of JSON-based state files."""
+    # Update events only mark a file dirty; a background thread rewrites dirty files at this interval
+    FLUSH_INTERVAL_SECONDS = 0.5
+
     def __init__(self, state_manager, event_bus):
         self.state = state_manager
         self.event_bus = event_bus
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._savers = {
+            'portfolio': self.save_portfolio, 'global_stats': self.save_global_stats,
+            'styles': self.save_styles, 'rsi_peak_tracker': self.save_rsi_peak_tracker
+        }
         self._subscribe_to_events()
+        threading.Thread(target=self._flush_loop, name="file-flush", daemon=True).start()
 
     def _subscribe_to_events(self):
-        self.event_bus.subscribe('PORTFOLIO_UPDATED', lambda d: self.save_portfolio())
-        self.event_bus.subscribe('STATS_UPDATED', lambda d: self.save_global_stats())
-        self.event_bus.subscribe('STYLES_UPDATED', lambda d: self.save_styles())
-        self.event_bus.subscribe('STATE_UPDATED_RSI', lambda d: self.save_rsi_peak_tracker())
+        self.event_bus.subscribe('PORTFOLIO_UPDATED', lambda d: self._mark_dirty('portfolio'))
+        self.event_bus.subscribe('STATS_UPDATED', lambda d: self._mark_dirty('global_stats'))
+        self.event_bus.subscribe('STYLES_UPDATED', lambda d: self._mark_dirty('styles'))
+        self.event_bus.subscribe('STATE_UPDATED_RSI', lambda d: self._mark_dirty('rsi_peak_tracker'), batched=True)
+
+    def _mark_dirty(self, name):
+        with self._dirty_lock:
+            self._dirty.add(name)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.FLUSH_INTERVAL_SECONDS)
+            # This thread ticks for the whole run regardless of trading or UI state, so it also lifts an expired global pause
+            try:
+                self.state.check_global_pause_expiry()
+            except Exception as e:
+                print(f"🚨 Error checking global pause expiry: {e}")
+            self.flush_dirty()
+
+    def flush_dirty(self):
+        """Writes every file marked dirty since the last flush, once each."""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        for name in dirty:
+            try:
+                saved = self._savers[name]()
+            except Exception as e:
+                # Keep the flush thread alive whatever a saver raises
+                print(f"🚨 Error saving {name}. Will retry. Error: {e}")
+                saved = False
+            if not saved:
+                # Keep the file dirty so the next flush retries it
+                self._mark_dirty(name)
 
     def load_all(self):
         """Load all persistent data from files at startup."""
@@ -27,27 +69,66 @@ class FileManager:
 
     def save_all_on_exit(self):
         """Save all necessary data on bot shutdown."""
+        with self._dirty_lock:
+            self._dirty.clear()
         self.save_uptime()
         self.save_global_stats()
         self.save_portfolio()
         self.save_styles()
         self.save_rsi_peak_tracker()
 
+    def _atomic_write(self, path, mode, write):
+        """Writes to a unique temp file beside path, fsyncs it and renames it over the target so a crash never leaves a torn file."""
+        with tempfile.NamedTemporaryFile(mode, dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            try:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, path)
+
+    def _atomic_write_json(self, path, obj, pretty=False):
+        if pretty:
+            self._atomic_write(path, 'w', lambda f: json.dump(obj, f, indent=4))
+        else:
+            self._atomic_write(path, 'w', lambda f: json.dump(obj, f, separators=(',', ':')))
+
+    def _atomic_write_pickle(self, path, obj):
+        self._atomic_write(path, 'wb', lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL))
+
     def load_rsi_peak_tracker(self):
+        # The tracker is rewritten on every RSI batch, so it is kept as a pickle rather than JSON
         if os.path.exists(config.RSI_PEAK_TRACKER_FILE):
             try:
-                with open(config.RSI_PEAK_TRACKER_FILE, 'r') as f:
-                    self.state.rsi_peak_tracker = json.load(f)
+                with open(config.RSI_PEAK_TRACKER_FILE, 'rb') as f:
+                    self.state.rsi_peak_tracker = pickle.load(f)
                 print("--- RSI peak tracker history loaded. ---")
+            except Exception as e:
+                # A truncated or corrupt pickle can raise almost anything, not just UnpicklingError
+                print(f"🚨 Warning: Could not load RSI peak tracker file. Starting fresh. Error: {e}")
+                self.state.rsi_peak_tracker = {}
+        elif os.path.exists(config.LEGACY_RSI_PEAK_TRACKER_FILE):
+            try:
+                with open(config.LEGACY_RSI_PEAK_TRACKER_FILE, 'r') as f:
+                    self.state.rsi_peak_tracker = json.load(f)
+                self.save_rsi_peak_tracker()
+                print("--- RSI peak tracker history converted from legacy JSON. ---")
             except (IOError, json.JSONDecodeError) as e:
                 print(f"🚨 Warning: Could not load RSI peak tracker file. Starting fresh. Error: {e}")
 
     def save_rsi_peak_tracker(self):
+        with self.state.lock:
+            tracker = {symbol: dict(info) for symbol, info in self.state.rsi_peak_tracker.items()}
         try:
-            with open(config.RSI_PEAK_TRACKER_FILE, 'w') as f:
-                json.dump(self.state.rsi_peak_tracker, f, indent=4)
-        except IOError as e:
+            self._atomic_write_pickle(config.RSI_PEAK_TRACKER_FILE, tracker)
+            return True
+        except (IOError, pickle.PicklingError) as e:
             print(f"🚨 CRITICAL: Could not save RSI peak tracker! Error: {e}")
+            return False
 
     def load_styles(self):
         if os.path.exists(config.STYLE_CONFIG_FILE):
@@ -65,10 +146,12 @@ class FileManager:
 
     def save_styles(self):
         try:
-            with open(config.STYLE_CONFIG_FILE, 'w') as f:
-                json.dump(self.state.styles, f, indent=4)
+            # Styles are edited by hand, so keep them indented
+            self._atomic_write_json(config.STYLE_CONFIG_FILE, self.state.styles, pretty=True)
+            return True
         except IOError as e:
             print(f"🚨 CRITICAL: Could not save styles! Error: {e}")
+            return False
 
     def load_portfolio(self):
         if os.path.exists(config.PORTFOLIO_FILE):
@@ -82,10 +165,11 @@ class FileManager:
 
     def save_portfolio(self):
         try:
-            with open(config.PORTFOLIO_FILE, 'w') as f:
-                json.dump(self.state.portfolio, f, indent=4)
+            self._atomic_write_json(config.PORTFOLIO_FILE, self.state.portfolio)
+            return True
         except IOError as e:
             print(f"🚨 CRITICAL: Could not save portfolio! Error: {e}")
+            return False
 
     def load_global_stats(self):
         if os.path.exists(config.STATS_FILE):
@@ -99,10 +183,11 @@ class FileManager:
 
     def save_global_stats(self):
         try:
-            with open(config.STATS_FILE, 'w') as f:
-                json.dump(self.state.global_stats, f, indent=4)
+            self._atomic_write_json(config.STATS_FILE, self.state.global_stats)
+            return True
         except IOError as e:
             print(f"🚨 CRITICAL: Could not save global stats! Error: {e}")
+            return False
 
     def load_uptime(self):
         if os.path.exists(config.UPTIME_FILE):
@@ -117,8 +202,7 @@ class FileManager:
         current_session_uptime = time.time() - self.state.bot_start_time
         final_total_uptime = self.state.total_uptime_seconds + current_session_uptime
         try:
-            with open(config.UPTIME_FILE, 'w') as f:
-                json.dump({"total_uptime_seconds": final_total_uptime}, f)
+            self._atomic_write_json(config.UPTIME_FILE, {"total_uptime_seconds": final_total_uptime})
             print(f"--- Total uptime saved: {timedelta(seconds=int(final_total_uptime))}. ---")
         except IOError as e:
             print(f"🚨 CRITICAL: Could not save uptime! Error: {e}")
@@ -1,46 +1,119 @@
+import math
+import os
+import queue
+import random
 import smtplib
+import struct
+import tempfile
+import threading
 import time
-from email.mime.text import MIMEText
+import wave
+from datetime import datetime
 from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+try:
+    import winsound # Windows only
+except ImportError:
+    winsound = None
+
 import config
 from .base_service import BaseService
-from plyer import notification
-import winsound
-
-
-
-import tkinter as tk
-import winsound
-import threading
-from datetime import datetime
 
 BEEP_ENABLED = True  # Toggle sound
+BEEP_FREQUENCY_HZ = 900
+BEEP_DURATION_MS = 500
+_beep_wav_path = None
+
+
+def _beep_wav():
+    """Renders the alert tone to a temp WAV once; PlaySound can only play asynchronously from a file."""
+    global _beep_wav_path
+    if _beep_wav_path is None:
+        rate = 22050
+        count = rate * BEEP_DURATION_MS // 1000
+        samples = (int(12000 * math.sin(2 * math.pi * BEEP_FREQUENCY_HZ * i / rate)) for i in range(count))
+        path = os.path.join(tempfile.gettempdir(), 'rsi_bot_beep.wav')
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            wav.writeframes(struct.pack(f'<{count}h', *samples))
+        _beep_wav_path = path
+    return _beep_wav_path
+
+
+def play_beep():
+    """Starts the alert tone and returns immediately, unlike winsound.Beep which blocks for its duration."""
+    if winsound is None:
+        return
+    try:
+        winsound.PlaySound(_beep_wav(), winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+    except (OSError, RuntimeError) as e:
+        print(f"Warning: Could not play alert sound. Error: {e}")
+
+
+class TradePopup:
+    """
+    One reusable trade popup window. Tk is owned by a single UI thread (started on first use);
+    other threads hand it (title, price, rsi) through a queue that the Tk loop polls via after().
+    """
+    POLL_MS = 100
+
+    def __init__(self):
+        self._pending = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._entry_price = 0.0
+
+    def show(self, title, entry_price, entry_rsi):
+        self._ensure_started()
+        self._pending.put((title, entry_price, entry_rsi))
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._ui_loop, name="trade-popup", daemon=True)
+                self._thread.start()
+
+    def _ui_loop(self):
+        # Imported here so Tk is only loaded once a popup is actually shown
+        import tkinter as tk
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            print(f"Warning: Trade popups disabled, Tk could not start. Error: {e}")
+            return
+        root.withdraw()
+        self._build(root)
+        root.after(self.POLL_MS, self._poll, root)
+        root.mainloop()
 
-
-def show_trade_popup(title, entry_price, entry_rsi):
-    def popup():
-        root = tk.Tk()
-        root.title(title)
-        root.geometry("360x240")
-        root.attributes("-topmost", True)
-        root.resizable(False, False)
-
-        frame = tk.Frame(root, bg="#ffffff")
+    def _build(self, root):
+        """Creates the popup widgets once; later popups only reconfigure their text."""
+        import tkinter as tk
+        window = self.window = tk.Toplevel(root)
+        window.geometry("360x240")
+        window.attributes("-topmost", True)
+        window.resizable(False, False)
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+        window.withdraw()
+
+        frame = tk.Frame(window, bg="#ffffff")
         frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         # Title
-        tk.Label(
-            frame, text=title, fg="#000000", bg="#ffffff",
+        self.title_label = tk.Label(
+            frame, fg="#000000", bg="#ffffff",
             font=("Segoe UI", 15, "bold")
-        ).pack(pady=(0, 8))
+        )
+        self.title_label.pack(pady=(0, 8))
 
         # Time
-        alert_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        tk.Label(
-            frame, text=f"Time: {alert_time}",
-            fg="#444444", bg="#ffffff",
+        self.time_label = tk.Label(
+            frame, fg="#444444", bg="#ffffff",
             font=("Segoe UI", 10)
-        ).pack()
+        )
+        self.time_label.pack()
 
         # TABLE
         table = tk.Frame(frame, bg="#ffffff")
@@ -52,12 +125,11 @@ def show_trade_popup(title, entry_price, entry_rsi):
             fg="#000000", font=("Segoe UI", 11, "bold")
         ).grid(row=0, column=0, sticky="w", pady=3)
 
-        entry_label = tk.Label(
-            table, text=f"${entry_price:.5f}",
-            bg="#ffffff", fg="#0b8a16",
+        self.price_label = tk.Label(
+            table, bg="#ffffff", fg="#0b8a16",
             font=("Segoe UI", 11, "bold")
         )
-        entry_label.grid(row=0, column=1, sticky="w", pady=3)
+        self.price_label.grid(row=0, column=1, sticky="w", pady=3)
 
         # RSI row
         tk.Label(
@@ -65,17 +137,16 @@ def show_trade_popup(title, entry_price, entry_rsi):
             fg="#000000", font=("Segoe UI", 11, "bold")
         ).grid(row=1, column=0, sticky="w", pady=3)
 
-        tk.Label(
-            table, text=f"{entry_rsi:.2f}",
-            bg="#ffffff", fg="#000000",
+        self.rsi_label = tk.Label(
+            table, bg="#ffffff", fg="#000000",
             font=("Segoe UI", 11)
-        ).grid(row=1, column=1, sticky="w", pady=3)
+        )
+        self.rsi_label.grid(row=1, column=1, sticky="w", pady=3)
 
         # Copy only the numeric entry price (NO popup alert)
         def copy_price():
-            clean_price = f"{entry_price:.5f}"
-            root.clipboard_clear()
-            root.clipboard_append(clean_price)
+            window.clipboard_clear()
+            window.clipboard_append(f"{self._entry_price:.5f}")
             # No alert shown — silent copy
 
         tk.Button(
@@ -84,18 +155,42 @@ def show_trade_popup(title, entry_price, entry_rsi):
             padx=12, pady=6, relief="flat", cursor="hand2"
         ).pack(pady=(0, 12))
 
-        # Clean & Bigger Close Button
+        # Clean & Bigger Close Button (hides the window so it can be reused)
         tk.Button(
-            frame, text="Close", command=root.destroy,
+            frame, text="Close", command=window.withdraw,
             bg="#eeeeee", fg="#000000",
             font=("Segoe UI", 11, "bold"),
             width=20, height=1,
             relief="flat", cursor="hand2"
         ).pack()
 
-        root.mainloop()
+    def _poll(self, root):
+        latest = None
+        try:
+            while True:
+                latest = self._pending.get_nowait()
+        except queue.Empty:
+            pass
+        if latest is not None:
+            self._update(*latest)
+        root.after(self.POLL_MS, self._poll, root)
+
+    def _update(self, title, entry_price, entry_rsi):
+        self._entry_price = entry_price
+        self.window.title(title)
+        self.title_label.config(text=title)
+        self.time_label.config(text=f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self.price_label.config(text=f"${entry_price:.5f}")
+        self.rsi_label.config(text=f"{entry_rsi:.2f}")
+        self.window.deiconify()
+        self.window.lift()
+
+
+_trade_popup = TradePopup()
+
 
-    threading.Thread(target=popup).start()
+def show_trade_popup(title, entry_price, entry_rsi):
+    _trade_popup.show(title, entry_price, entry_rsi)
 
 
 
@@ -103,8 +198,20 @@ class EmailService(BaseService):
     """
     Handles sending email notifications based on bot events.
     """
+    # The SMTP session is reused across emails and reopened once it is older than this
+    SMTP_MAX_AGE_SECONDS = 300
+    # A session used within this many seconds skips the NOOP round trip before the next send
+    SMTP_HEALTH_CHECK_IDLE_SECONDS = 30
+    # Emails queued within this window are combined into a single message
+    BATCH_WINDOW_SECONDS = 1.0
+
     def __init__(self, state_manager, event_bus):
         super().__init__(state_manager, event_bus)
+        self._smtp = None
+        self._smtp_opened_at = 0
+        self._smtp_used_at = 0
+        self._smtp_lock = threading.Lock()
+        self._mailq = queue.Queue()
         self._subscribe_to_events()
 
     def _subscribe_to_events(self):
@@ -114,8 +221,34 @@ class EmailService(BaseService):
         self.event_bus.subscribe('GLOBAL_PAUSE_TRIGGERED', self.handle_global_pause)
 
     def run(self):
-        """The EmailService is event-driven, so its run loop is simple."""
-        pass
+        """Sends queued emails, so SMTP latency and retry backoff never block event dispatch."""
+        while True:
+            batch = [self._mailq.get()]
+            deadline = time.monotonic() + self.BATCH_WINDOW_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._mailq.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # A burst goes out as one combined message, so it costs a single SMTP transaction
+            subject, html_body = batch[0] if len(batch) == 1 else self._combine(batch)
+            try:
+                self._send_email_with_retries(subject, html_body)
+            except Exception as e:
+                print(f"🚨 EMAIL ERROR: Unexpected error in email sender: {e}")
+
+    @staticmethod
+    def _combine(batch):
+        subject = f"[bot] {len(batch)} events: " + "; ".join(subject[:40] for subject, _ in batch)
+        html_body = "<hr/>".join(html_body for _, html_body in batch)
+        return subject, html_body
+
+    def _queue_email(self, subject, html_body):
+        """Hands an email to the sender thread and returns immediately."""
+        self._mailq.put((subject, html_body))
 
     # def handle_trade_opened(self, trade_data):
     #     if not self.state.controls['email_enabled'].is_set(): return
@@ -137,8 +270,7 @@ class EmailService(BaseService):
 
     def handle_trade_opened(self, trade_data):
 
-        symbol = next((s for s, t in self.state.active_trades.items()
-                    if t['alert_num'] == trade_data['alert_num']), None)
+        symbol = self.state.active_trades_by_alert.get(trade_data['alert_num'])
         if not symbol:
             return
 
@@ -148,7 +280,7 @@ class EmailService(BaseService):
         entry_rsi = trade_data['entry_rsi']
 
         if BEEP_ENABLED:
-            winsound.Beep(900, 500)
+            play_beep()
 
         show_trade_popup(title, entry_price, entry_rsi)
 
@@ -165,11 +297,7 @@ class EmailService(BaseService):
         pnl_usdt = trade_data['pnl_usdt']
         pnl_percent = trade_data['pnl_percent']
         
-        symbol = "UNKNOWN"
-        for s, info in self.state.alerted_coins.items():
-            if info.get('reason') == close_data['reason']:
-                symbol = s
-                break
+        symbol = close_data.get('symbol', "UNKNOWN")
 
         subject = f"✅ SHORT TRADE CLOSED: {symbol} - {close_data['reason']} ({pnl_percent:+.2f}%)"
         html_body = f"""
@@ -180,7 +308,7 @@ class EmailService(BaseService):
         <p><b>Close Price:</b> ${close_data['close_price']:.8f} (RSI: {close_data['exit_rsi']:.2f})</p>
         <p><b>New Portfolio Balance:</b> ${close_data['new_balance']:.2f}</p>
         """
-        self._send_email_with_retries(subject, html_body)
+        self._queue_email(subject, html_body)
 
     def handle_global_pause(self, data):
         if not self.state.controls['email_enabled'].is_set(): return
@@ -191,24 +319,74 @@ class EmailService(BaseService):
         <p>The bot has recorded {data['loss_count']} losing trades in the last 24 hours, exceeding the limit of {config.LOSS_TRADES_LIMIT_24H}.</p>
         <p>Trading will be paused for {config.GLOBAL_PAUSE_DURATION_HOURS} hours or until manually resumed.</p>
         """
-        self._send_email_with_retries(subject, body)
-
-    def _send_email_with_retries(self, subject, html_body, max_retries=3):
+        self._queue_email(subject, body)
+
+    def _get_connection(self):
+        """Returns a logged-in SMTP session, reconnecting if it is stale or fails a NOOP health check. Call under _smtp_lock."""
+        now = time.monotonic()
+        if self._smtp is not None and now - self._smtp_opened_at > self.SMTP_MAX_AGE_SECONDS:
+            self._close_connection()
+        if self._smtp is not None and now - self._smtp_used_at < self.SMTP_HEALTH_CHECK_IDLE_SECONDS:
+            return self._smtp
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_connection()
+        server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=30)
+        try:
+            server.starttls()
+            server.login(config.EMAIL_SENDER, config.EMAIL_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        self._smtp, self._smtp_opened_at = server, time.monotonic()
+        return server
+
+    def _send(self, msg):
+        """Sends on the pooled session; a reused session the server already dropped is replaced once, without backoff."""
+        try:
+            self._get_connection().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._close_connection()
+            self._get_connection().send_message(msg)
+        self._smtp_used_at = time.monotonic()
+
+    def _close_connection(self):
+        server, self._smtp = self._smtp, None
+        if server is None: return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def close(self):
+        """Closes the pooled SMTP session on shutdown."""
+        with self._smtp_lock:
+            self._close_connection()
+
+    def _send_email_with_retries(self, subject, html_body, max_retries=3, max_delay=30):
         """
         The actual email sending logic, now wrapped in a retry loop.
         """
+        # Built once per email; retries resend the same message object
+        msg = MIMEMultipart()
+        msg['From'] = config.EMAIL_SENDER
+        msg['To'] = config.EMAIL_RECEIVER
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html_body, 'html'))
+
         for attempt in range(max_retries):
             try:
-                msg = MIMEMultipart()
-                msg['From'] = config.EMAIL_SENDER
-                msg['To'] = config.EMAIL_RECEIVER
-                msg['Subject'] = subject
-                msg.attach(MIMEText(html_body, 'html'))
-
-                with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-                    server.starttls()
-                    server.login(config.EMAIL_SENDER, config.EMAIL_PASSWORD)
-                    server.send_message(msg)
+                with self._smtp_lock:
+                    try:
+                        self._send(msg)
+                    except (smtplib.SMTPServerDisconnected, OSError):
+                        # Drop the broken session so the retry below starts a fresh one
+                        self._close_connection()
+                        raise
                 
                 print(f"--- Email sent successfully: '{subject}' ---")
                 return True
@@ -219,8 +397,8 @@ class EmailService(BaseService):
             except Exception as e:
                 print(f"🚨 EMAIL ERROR: Failed to send email on attempt {attempt + 1}/{max_retries}. Error: {e}")
                 if attempt < max_retries - 1:
-                    delay = 10 * (2 ** attempt)
-                    print(f"--- Retrying email in {delay} seconds... ---")
+                    delay = min(max_delay, 10 * (2 ** attempt) * (1 + random.random() * 0.5))
+                    print(f"--- Retrying email in {delay:.1f} seconds... ---")
                     time.sleep(delay)
                 else:
                     print(f"🚨 CRITICAL EMAIL ERROR: All {max_retries} attempts to send email failed.")
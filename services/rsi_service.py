@@ -1,24 +1,94 @@
 import time
+import random
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import orjson
 import requests
-import pandas as pd
-import pandas_ta as ta
+from requests.adapters import HTTPAdapter
 import config
 from .base_service import BaseService
 
+@functools.lru_cache(maxsize=32)
+def _ewm_weights(count, length):
+    """Wilder decay weights, oldest first; only a few (count, length) pairs ever occur, so they are built once."""
+    weights = (1.0 - 1.0 / length) ** np.arange(count - 1, -1, -1, dtype=np.float64)
+    weights.flags.writeable = False
+    return weights
+
+def wilder_rsi_last(closes, length):
+    """
+    Returns the latest RSI of a float64 close array with Wilder smoothing (alpha = 1/length),
+    matching pandas_ta's rsi (adjusted EWM, min_periods=length), or None if it is undefined.
+    """
+    deltas = np.diff(closes)
+    if len(deltas) < length:
+        return None
+    # The adjusted EWM divides gains and losses by the same weight sum, so the ratio only needs the weighted sums
+    weights = _ewm_weights(len(deltas), length)
+    gain = float(np.dot(weights, np.maximum(deltas, 0.0)))
+    # Weighted losses = weighted gains - weighted net change, which saves a second clip pass
+    loss = max(gain - float(np.dot(weights, deltas)), 0.0)
+    if gain + loss == 0:
+        return None
+    return 100.0 * gain / (gain + loss)
+
 class RsiService(BaseService):
     """
     Fetches RSI values for relevant coins and publishes them.
     """
+    # Klines requests are IO-bound, so a scan fans out over a small thread pool
+    FETCH_WORKERS = 16
+    # Global request pacing shared by all workers (the old per-symbol 50ms sleep, as a rate)
+    MAX_REQUESTS_PER_SECOND = 20
+    # Circuit breaker: this many network/5xx failures within the window stop all klines calls for
+    # BREAKER_OPEN_SECONDS, after which a single probe request decides whether to close it again
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_WINDOW_SECONDS = 60
+    BREAKER_OPEN_SECONDS = 30
+    # (connect, read): an unreachable host fails fast instead of tying up a worker for the full read timeout
+    KLINES_TIMEOUT = (3.05, 10)
+    # Candles requested per symbol, as a multiple of RSI_LENGTH. The smoothing weights the oldest candle by
+    # (1 - 1/length)^n, so 6x keeps the last RSI within ~0.1 of a 100-candle window; 3x drifted by up to ~5.
+    KLINES_WARMUP_FACTOR = 6
+
     def __init__(self, state_manager, event_bus):
         super().__init__(state_manager, event_bus)
         self.session = requests.Session()
         self.session.headers.update({'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.FETCH_WORKERS)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.FETCH_WORKERS, thread_name_prefix="rsi-fetch")
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._breaker_lock = threading.Lock()
+        self._breaker_failures = []
+        self._breaker_open_until = 0.0
+        self._breaker_probing = False
+        # symbol -> (window limit, close_time of the last closed candle, closes of the closed candles)
+        self._closed_closes = {}
+
+    def _throttle(self):
+        """Blocks until this worker's request slot under MAX_REQUESTS_PER_SECOND comes up."""
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_request_at)
+            self._next_request_at = slot + 1.0 / self.MAX_REQUESTS_PER_SECOND
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _back_off(self, seconds):
+        """Pushes the shared request schedule out, so every worker waits, not just the one that was limited."""
+        with self._rate_lock:
+            self._next_request_at = max(self._next_request_at, time.monotonic() + seconds)
 
     def run(self):
         print("--- RSI Service started. ---")
         time.sleep(10) # Initial delay to allow market data to populate
+        rsi_enabled = self.state.controls["rsi_enabled"]
         while True:
-            self.state.controls["rsi_enabled"].wait()
+            rsi_enabled.wait()
             try:
                 symbols_to_check = self.state.get_symbols_to_monitor()
 
@@ -29,21 +99,26 @@ class RsiService(BaseService):
 
                 status_msg_prefix = f"Scanning {len(symbols_to_check)} coins"
 
-                for i, symbol in enumerate(symbols_to_check):
-                    if not self.state.controls["rsi_enabled"].is_set():
+                futures = {self._executor.submit(self._fetch_rsi_with_retries, symbol): symbol for symbol in symbols_to_check}
+                # Results are applied on this thread as they arrive, so state updates stay single-threaded
+                for i, future in enumerate(as_completed(futures)):
+                    if not rsi_enabled.is_set():
+                        for pending in futures:
+                            pending.cancel()
                         self.state.set_rsi_status("paused", "RSI service paused by user.")
                         break
-                    
+
+                    symbol = futures[future]
                     self.state.set_rsi_status("active", f"{status_msg_prefix} ({i+1}/{len(symbols_to_check)})", symbol)
-                    
-                    rsi_value = self._fetch_rsi_with_retries(symbol)
-                    
+
+                    rsi_value = future.result()
+
                     if rsi_value is not None:
                         self.state.update_rsi_value(symbol, rsi_value)
-                    
-                    time.sleep(0.05)
 
-                if self.state.controls["rsi_enabled"].is_set():
+                self.state.flush_rsi_updates()
+
+                if rsi_enabled.is_set():
                     self.state.set_rsi_status("idle", "Cycle complete. Waiting...")
                 
                 time.sleep(config.RSI_REFRESH_SECONDS)
@@ -53,51 +128,106 @@ class RsiService(BaseService):
                 self.state.set_rsi_status("error", f"Critical Error: {e}")
                 time.sleep(30)
 
-    def _fetch_rsi_with_retries(self, symbol, max_retries=3):
+    def _breaker_allows(self):
+        """False while the breaker is open; once it expires, lets exactly one probe request through."""
+        with self._breaker_lock:
+            if not self._breaker_open_until:
+                return True
+            if self._breaker_probing or time.monotonic() < self._breaker_open_until:
+                return False
+            self._breaker_probing = True
+            return True
+
+    def _record_success(self):
+        with self._breaker_lock:
+            if self._breaker_open_until:
+                print("--- RSI Fetch: Binance klines reachable again. Circuit closed. ---")
+            self._breaker_failures.clear()
+            self._breaker_open_until = 0.0
+            self._breaker_probing = False
+
+    def _record_failure(self):
+        with self._breaker_lock:
+            now = time.monotonic()
+            self._breaker_failures = [t for t in self._breaker_failures if now - t < self.BREAKER_WINDOW_SECONDS]
+            self._breaker_failures.append(now)
+            if self._breaker_probing or len(self._breaker_failures) >= self.BREAKER_FAILURE_THRESHOLD:
+                if not self._breaker_probing:
+                    print(f"🚨 RSI Fetch: {len(self._breaker_failures)} klines failures in {self.BREAKER_WINDOW_SECONDS}s. Pausing requests for {self.BREAKER_OPEN_SECONDS}s.")
+                self._breaker_open_until = now + self.BREAKER_OPEN_SECONDS
+                self._breaker_failures.clear()
+                self._breaker_probing = False
+
+    def _fetch_rsi_with_retries(self, symbol, max_retries=3, max_delay=30):
         """
         Fetches RSI, but retries with exponential backoff if it fails.
         Handles new coins with insufficient data.
         """
         base_delay = 5
+        rsi_enabled = self.state.controls["rsi_enabled"]
         for attempt in range(max_retries):
+            # Fetches already running when RSI is paused give up instead of spending request slots
+            if not rsi_enabled.is_set() or not self._breaker_allows():
+                return None
             try:
-                params = {'symbol': symbol, 'interval': '1h', 'limit': 100}
-                response = self.session.get("https://fapi.binance.com/fapi/v1/klines", params=params, timeout=10  )
-                
-                if response.status_code == 429:
-                    print(f"RSI Fetch: Rate limited by Binance API. Waiting for {response.headers.get('Retry-After', 60)}s.")
-                    time.sleep(int(response.headers.get('Retry-After', 60)))
+                limit = min(100, max(config.RSI_LENGTH * self.KLINES_WARMUP_FACTOR, 40))
+                # Closed candles never change, only the open one does. While the cached closed window is still
+                # current, fetch just the last closed candle (to confirm it) plus the open one.
+                cached = self._closed_closes.get(symbol)
+                incremental = cached is not None and cached[0] == limit and time.time() * 1000 <= cached[1] + 3_600_000
+                params = {'symbol': symbol, 'interval': '1h', 'limit': 2 if incremental else limit}
+                self._throttle()
+                response = self.session.get("https://fapi.binance.com/fapi/v1/klines", params=params, timeout=self.KLINES_TIMEOUT)
+
+                if response.status_code >= 500:
+                    self._record_failure()
+                    return None
+                # Any other answer means the endpoint is up, even if this symbol was rejected or rate limited
+                self._record_success()
+
+                if response.status_code in (429, 418):
+                    # 418 is an IP ban for ignoring 429s; both carry Retry-After
+                    retry_after = int(response.headers.get('Retry-After', 60))
+                    print(f"RSI Fetch: Rate limited by Binance API ({response.status_code}). Waiting for {retry_after}s.")
+                    self._back_off(retry_after)
+                    if response.status_code == 418:
+                        return None
                     continue
                 elif response.status_code != 200:
                     return None
 
-                klines = response.json()
-                
-                if not klines or len(klines) < config.RSI_LENGTH:
-                    return 'New_Coin'
+                # orjson parses the raw bytes directly, skipping requests' text decoding and the stdlib parser
+                klines = orjson.loads(response.content)
 
-                df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'])
-                df['close'] = pd.to_numeric(df['close'])
-                
-                rsi_series = df.ta.rsi(length=config.RSI_LENGTH)
-                
-                # --- CORRECTED LOGIC HERE ---
-                # This is the fix. We check if the series is valid and the last value is not NaN.
-                if rsi_series is not None and not rsi_series.empty and pd.notna(rsi_series.iloc[-1]):
-                    return rsi_series.iloc[-1]
+                if incremental:
+                    if len(klines) != 2 or klines[0][6] != cached[1]:
+                        # A new candle closed (local clock behind Binance's); rebuild from a full window
+                        self._closed_closes.pop(symbol, None)
+                        continue
+                    closes = np.append(cached[2], float(klines[1][4]))
                 else:
-                    # This case might happen if the calculation still fails for other reasons.
-                    return None
+                    if not klines or len(klines) < config.RSI_LENGTH:
+                        return 'New_Coin'
+
+                    # Close is column 4 of each kline; only that column is needed, so no DataFrame is built.
+                    # NumPy converts the decimal strings itself, which beats a per-row float() call.
+                    closes = np.asarray([row[4] for row in klines], dtype=np.float64)
+                    self._closed_closes[symbol] = (limit, klines[-2][6], closes[:-1])
+
+                # Plain float (or None when undefined), so consumers can use an exact type check instead of isinstance
+                return wilder_rsi_last(closes, config.RSI_LENGTH)
 
             except requests.exceptions.RequestException as e:
                 print(f"RSI Fetch: Network error for {symbol}: {e}")
+                self._record_failure()
             except Exception as e:
                 # This will now correctly catch the pandas error if it ever happens again, but the fix should prevent it.
                 print(f"RSI Fetch: An unexpected error occurred processing {symbol}: {e}")
                 return None
 
-            delay = base_delay * (2 ** attempt)
-            print(f"RSI Fetch: Will retry {symbol} in {delay} seconds... (Attempt {attempt + 1}/{max_retries})")
+            # Jittered so symbols that failed together don't all retry on the same tick
+            delay = min(max_delay, base_delay * (2 ** attempt) * (1 + random.random() * 0.5))
+            print(f"RSI Fetch: Will retry {symbol} in {delay:.1f} seconds... (Attempt {attempt + 1}/{max_retries})")
             time.sleep(delay)
 
         print(f"RSI Fetch: All {max_retries} retries failed for {symbol}. Skipping for this cycle.")
@@ -1,6 +1,8 @@
 import time
 import math
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from .base_service import BaseService
 import config
 from binance.client import Client
@@ -11,8 +13,11 @@ class BinanceTrader:
     def __init__(self, event_bus):
         self.client = None
         self.is_authenticated = False
-        self.exchange_info = None
-        self.symbol_info = {}
+        # symbol -> order formatting rules, precomputed on every exchange info refresh.
+        # Only these small dicts are kept; the raw exchange info payload is not retained.
+        self.symbol_rules = {}
+        # symbol -> leverage last confirmed by Binance, so repeat opens skip the change-leverage call
+        self._leverage_set = {}
         self.event_bus = event_bus
         self.rules_loaded = threading.Event() # <-- NEW: Event to signal that rules are loaded
         self._initialize_client()
@@ -25,8 +30,9 @@ class BinanceTrader:
     def handle_exchange_info_update(self, new_info):
         """Updates the internal exchange_info when the event is published."""
         print("--- BinanceTrader: Received updated exchange info. Refreshing symbol rules. ---")
-        self.exchange_info = new_info
-        self.symbol_info.clear()
+        # Index once so per-order lookups are a dict hit instead of a scan over every listed symbol.
+        # The table is built first and then swapped in, so an order never sees a half-refreshed one.
+        self.symbol_rules = {s['symbol']: self._build_symbol_rules(s) for s in new_info.get('symbols', ())}
         self.rules_loaded.set() # <-- NEW: Signal that the rules are now loaded and ready
         print("--- BinanceTrader: Symbol rules Refreshed ---")
 
@@ -90,11 +96,9 @@ class BinanceTrader:
             quantity = abs(position_amt)
             order = self.client.futures_create_order(
                 symbol=symbol, side=side, type=Client.ORDER_TYPE_MARKET,
-                quantity=quantity, reduceOnly=True
+                quantity=quantity, reduceOnly=True, newOrderRespType='RESULT'
             )
-            time.sleep(0.5)
-            filled_order = self.client.futures_get_order(symbol=symbol, orderId=order['orderId'])
-            close_price = float(filled_order.get('avgPrice', 0.0))
+            _, close_price = self._await_fill_price(symbol, order)
             return True, close_price
         except BinanceAPIException as e:
             print(f"🚨 LIVE CLOSE ERROR for {symbol}: {e}")
@@ -103,61 +107,84 @@ class BinanceTrader:
             print(f"🚨 An unexpected error occurred during live close for {symbol}: {e}")
             return False, 0.0
 
-    def get_live_pnl(self, symbol):
-        if not self.is_authenticated: return 0.0, 0.0
+    @staticmethod
+    def _fill_price(order):
+        """Average fill price carried by an order response, or 0.0 if it has none yet."""
+        avg_price = float(order.get('avgPrice') or 0)
+        if avg_price == 0:
+            cum_quote, executed_qty = float(order.get('cumQuote') or 0), float(order.get('executedQty') or 0)
+            if cum_quote > 0 and executed_qty > 0:
+                avg_price = cum_quote / executed_qty
+        return avg_price
+
+    def _await_fill_price(self, symbol, order):
+        """Returns (order, avg price); the order is only re-queried when the create response lacks fill data."""
+        avg_price = self._fill_price(order)
+        if avg_price == 0:
+            time.sleep(0.5)
+            order = self.client.futures_get_order(symbol=symbol, orderId=order['orderId'])
+            avg_price = self._fill_price(order)
+        return order, avg_price
+
+    @staticmethod
+    def position_pnl(position):
+        unrealized_pnl = float(position.get('unRealizedProfit', 0.0))
+        initial_margin = float(position.get('initialMargin', 0.0))
+        if initial_margin > 0:
+            return unrealized_pnl, (unrealized_pnl / initial_margin) * 100
+        return 0.0, 0.0
+
+    def get_live_pnl_all(self):
+        """Returns {symbol: (pnl_usdt, pnl_percent)} for every position from one API call, or None on error."""
+        if not self.is_authenticated: return {}
         try:
-            positions = self.client.futures_position_information(symbol=symbol)
-            if positions:
-                position = positions[0]
-                unrealized_pnl = float(position.get('unRealizedProfit', 0.0))
-                initial_margin = float(position.get('initialMargin', 0.0))
-                
-                if initial_margin > 0:
-                    pnl_percent = (unrealized_pnl / initial_margin) * 100
-                    return unrealized_pnl, pnl_percent
-            return 0.0, 0.0
+            return {p['symbol']: self.position_pnl(p) for p in self.client.futures_position_information()}
         except BinanceAPIException as e:
             if e.code == -2015 and not hasattr(self, '_logged_pnl_error'):
                 print(f"🚨 PERMISSIONS ERROR: Could not fetch live PNL. Check API key permissions and IP whitelist. Error: {e}")
                 self._logged_pnl_error = True
             elif e.code != -2015:
-                 print(f"🚨 Could not fetch live PNL for {symbol}: {e}")
-            return 0.0, 0.0
+                 print(f"🚨 Could not fetch live PNL: {e}")
+            return None
         except Exception as e:
-            print(f"🚨 Unexpected error fetching live PNL for {symbol}: {e}")
-            return 0.0, 0.0
+            print(f"🚨 Unexpected error fetching live PNL: {e}")
+            return None
 
-    def _get_symbol_info(self, symbol):
-        if symbol in self.symbol_info: return self.symbol_info[symbol]
-        if not self.exchange_info:
+    @staticmethod
+    def _build_symbol_rules(info):
+        """Derives the quantity factor, price precision and min notional from a symbol's filters."""
+        filters = {f['filterType']: f for f in info.get('filters', ())}
+        precision = info.get('quantityPrecision')
+        tick_size = filters.get('PRICE_FILTER', {}).get('tickSize')
+        min_notional = filters.get('MIN_NOTIONAL', {}).get('notional')
+        return {
+            'q_factor': 10 ** precision if precision is not None else None,
+            'price_precision': int(round(-math.log10(float(tick_size)))) if tick_size else None,
+            'min_notional': float(min_notional) if min_notional is not None else None,
+        }
+
+    def _get_symbol_rules(self, symbol):
+        if not self.rules_loaded.is_set():
             print(f"--- Exchange info not available yet. Cannot get rules for {symbol}. ---")
             return None
-        try:
-            info = next(s for s in self.exchange_info['symbols'] if s['symbol'] == symbol)
-            self.symbol_info[symbol] = info
-            return info
-        except StopIteration:
+        rules = self.symbol_rules.get(symbol)
+        if rules is None:
             print(f"--- Could not find exchange info for {symbol}. It may not be a valid futures pair. ---")
-            return None
+        return rules
 
     def _format_quantity(self, symbol, quantity):
-        info = self._get_symbol_info(symbol)
-        if not info: return round(quantity, 3)
-        precision = info.get('quantityPrecision')
-        if precision is None: return round(quantity, 3)
-        factor = 10 ** precision
+        rules = self._get_symbol_rules(symbol)
+        if not rules or rules['q_factor'] is None: return round(quantity, 3)
+        factor = rules['q_factor']
         return math.floor(quantity * factor) / factor
 
     def _format_price(self, symbol, price):
-        info = self._get_symbol_info(symbol)
-        if not info: return round(price, 4)
-        price_filter = next((f for f in info['filters'] if f['filterType'] == 'PRICE_FILTER'), None)
-        if not price_filter or 'tickSize' not in price_filter: return round(price, 4)
-        tick_size = float(price_filter['tickSize'])
-        precision = int(round(-math.log(tick_size, 10), 0))
-        return round(price, precision)
-
-    def execute_short_trade(self, symbol, usdt_amount, leverage, take_profit_percent):
+        rules = self._get_symbol_rules(symbol)
+        if not rules or rules['price_precision'] is None: return round(price, 4)
+        return round(price, rules['price_precision'])
+
+    def execute_short_trade(self, symbol, usdt_amount, leverage, take_profit_percent, last_price=None):
+        """Opens a market short with a take-profit; last_price, when given, replaces the ticker request."""
         if not self.is_authenticated: return None, None, "Not Authenticated"
         
         # --- MODIFIED: Wait until rules are loaded before executing a trade ---
@@ -168,46 +195,69 @@ class BinanceTrader:
                 return None, None, "Timed out waiting for exchange rules."
 
         try:
-            self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
-            symbol_info = self._get_symbol_info(symbol)
-            if not symbol_info:
+            if self._leverage_set.get(symbol) != leverage:
+                self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+                self._leverage_set[symbol] = leverage
+            rules = self._get_symbol_rules(symbol)
+            if not rules:
                 return None, None, f"Invalid futures symbol or info not found."
-            min_notional_filter = next((f for f in symbol_info['filters'] if f['filterType'] == 'MIN_NOTIONAL'), None)
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            price = float(ticker['price'])
+            min_notional = rules['min_notional']
+            price = last_price or float(self.client.get_symbol_ticker(symbol=symbol)['price'])
             raw_quantity = (usdt_amount * leverage) / price
             quantity = self._format_quantity(symbol, raw_quantity)
             notional_value = quantity * price
-            if min_notional_filter and notional_value < float(min_notional_filter['notional']):
-                error_msg = f"Order size ({notional_value:.2f} USDT) is less than the minimum required ({min_notional_filter['notional']} USDT)."
+            if min_notional is not None and notional_value < min_notional:
+                error_msg = f"Order size ({notional_value:.2f} USDT) is less than the minimum required ({min_notional} USDT)."
                 return None, None, error_msg
             if quantity <= 0:
                 return None, None, "Calculated quantity is zero."
-            order = self.client.futures_create_order(symbol=symbol, side=Client.SIDE_SELL, type=Client.ORDER_TYPE_MARKET, quantity=quantity)
-            time.sleep(0.5)
-            filled_order = self.client.futures_get_order(symbol=symbol, orderId=order['orderId'])
-            entry_price_actual = float(filled_order['avgPrice'])
+            # RESULT responses carry the fill of a market order, so the follow-up query is usually skipped
+            order = self.client.futures_create_order(symbol=symbol, side=Client.SIDE_SELL, type=Client.ORDER_TYPE_MARKET, quantity=quantity, newOrderRespType='RESULT')
+            filled_order, entry_price_actual = self._await_fill_price(symbol, order)
             if entry_price_actual == 0: entry_price_actual = price
+            filled_order['avgPrice'] = str(entry_price_actual)
             raw_tp_price = entry_price_actual * (1 - (take_profit_percent / 100) / leverage)
             tp_price = self._format_price(symbol, raw_tp_price)
             tp_order = self.client.futures_create_order(symbol=symbol, side=Client.SIDE_BUY, type='TAKE_PROFIT_MARKET', stopPrice=tp_price, closePosition=True)
             return filled_order, tp_order, None
         except BinanceAPIException as e:
+            self._leverage_set.pop(symbol, None) # Re-confirm leverage on the next attempt
             error_message = f"Binance API Error: Code={e.code}, Msg={e.message}"
             return None, None, error_message
         except Exception as e:
+            self._leverage_set.pop(symbol, None)
             error_message = f"Unexpected Error: {str(e)}"
             return None, None, error_message
 
 class TradingService(BaseService):
     """The core trading logic engine."""
+    # Websocket prices older than this are not trusted for sizing a live order
+    LIVE_PRICE_MAX_AGE_SECONDS = 5
+    # With no paper trades the monitor sleeps until one opens, waking at least this often
+    IDLE_WAIT_SECONDS = 5
+    # Live closes run in parallel so simultaneous exits do not queue behind each other; bounded for rate limits
+    CLOSE_WORKERS = 8
+    # Live opens leave the event bus for their own pool, so order round-trips never hold bus workers
+    OPEN_WORKERS = 2
+
     def __init__(self, state_manager, event_bus, db_manager):
         super().__init__(state_manager, event_bus)
         self.db_manager = db_manager
         self.binance_trader = BinanceTrader(event_bus)
         self._subscribe_to_events()
         self.is_synced = False
-        self.live_trade_monitor_threads = {}
+        # Live trades are polled by one monitor thread with a single positions call per tick
+        self.live_monitored_symbols = set()
+        self._live_monitor_lock = threading.Lock()
+        self._live_monitor_wakeup = threading.Event()
+        self._live_monitor_thread = None
+        self._close_pool = ThreadPoolExecutor(max_workers=self.CLOSE_WORKERS, thread_name_prefix="live-close")
+        self._closing_symbols = set() # Guarded by _live_monitor_lock
+        self._open_pool = ThreadPoolExecutor(max_workers=self.OPEN_WORKERS, thread_name_prefix="live-open")
+        self._opening_symbols = set() # Guarded by _live_monitor_lock
+        # Per-trade PNL factors and take-profit price, only touched by the paper-trade monitor loop
+        self._paper_trade_constants = {}
+        self._paper_trade_opened = threading.Event()
 
     def initial_sync(self):
         if self.is_synced: return
@@ -245,7 +295,8 @@ class TradingService(BaseService):
                     print(f"--- {symbol} is already active in the bot. Skipping sync. ---")
                     continue
                 db_trade = db_trades.get(symbol)
-                pnl_usdt, pnl_percent = self.binance_trader.get_live_pnl(symbol)
+                # The position record already carries the PNL fields, so no per-symbol request is needed
+                pnl_usdt, pnl_percent = self.binance_trader.position_pnl(pos)
                 if db_trade:
                     print(f"--- Syncing {symbol}: Found matching 'Open' trade in database. Restoring state. ---")
                     self.state.restore_live_trade(
@@ -279,117 +330,206 @@ class TradingService(BaseService):
         while True:
             self.state.controls["trading_enabled"].wait()
             try:
-                with self.state.lock:
-                    paper_trades = {s: t for s, t in self.state.active_trades.items() if t.get('source', 'Bot').lower() != 'live'}
+                self._paper_trade_opened.clear()
+                # Read paths take an atomic dict copy instead of the state lock; writers still lock
+                paper_trades = {s: t for s, t in self.state.active_trades.copy().items() if t.get('source', 'Bot').lower() != 'live'}
+                for symbol in self._paper_trade_constants.keys() - paper_trades.keys():
+                    del self._paper_trade_constants[symbol]
                 if not paper_trades:
-                    time.sleep(5)
+                    self._paper_trade_opened.wait(self.IDLE_WAIT_SECONDS)
                     continue
-                for symbol, trade in paper_trades.items():
-                    self._monitor_paper_trade(symbol, trade)
+                self._monitor_paper_trades(paper_trades)
             except Exception as e:
                 print(f"!!! Error in Paper Trade Monitor loop: {e} !!!")
                 time.sleep(60)
             time.sleep(config.TRADE_MONITOR_INTERVAL_SECONDS)
 
     def _handle_trade_opened(self, trade_data):
-        if trade_data.get('source') == 'Live':
-            symbol = next((s for s, t in self.state.active_trades.items() if t['alert_num'] == trade_data['alert_num']), None)
+        if trade_data.get('source') != 'Live':
+            self._paper_trade_opened.set()
+        else:
+            symbol = self.state.active_trades_by_alert.get(trade_data['alert_num'])
             if symbol:
                 self._start_live_trade_monitor(symbol)
 
     def _handle_trade_closed(self, close_data):
-        symbol = close_data['trade_data'].get('symbol')
-        if symbol and symbol in self.live_trade_monitor_threads:
-            del self.live_trade_monitor_threads[symbol]
-            print(f"--- Stopped PNL monitor thread for closed trade: {symbol} ---")
+        symbol = close_data.get('symbol')
+        with self._live_monitor_lock:
+            if symbol not in self.live_monitored_symbols: return
+            self.live_monitored_symbols.discard(symbol)
+        print(f"--- Stopped PNL monitoring for closed trade: {symbol} ---")
 
     def _start_live_trade_monitor(self, symbol):
-        if symbol in self.live_trade_monitor_threads:
-            return
-        
-        thread = threading.Thread(target=self._dedicated_live_monitor_loop, args=(symbol,), daemon=True)
-        self.live_trade_monitor_threads[symbol] = thread
-        thread.start()
-        print(f"--- Started dedicated PNL monitor thread for: {symbol} ---")
+        with self._live_monitor_lock:
+            if symbol in self.live_monitored_symbols:
+                return
+            self.live_monitored_symbols.add(symbol)
+            if self._live_monitor_thread is None:
+                self._live_monitor_thread = threading.Thread(target=self._live_monitor_loop, name="live-pnl-monitor", daemon=True)
+                self._live_monitor_thread.start()
+        self._live_monitor_wakeup.set()
+        print(f"--- Started PNL monitoring for: {symbol} ---")
 
-    def _dedicated_live_monitor_loop(self, symbol):
+    def _live_monitor_loop(self):
         while True:
-            with self.state.lock:
-                if symbol not in self.state.active_trades:
-                    break
+            with self._live_monitor_lock:
+                watched = set(self.live_monitored_symbols)
+            active_trades = self.state.active_trades
+            closed = {s for s in watched if s not in active_trades}
+            with self._live_monitor_lock:
+                # Trades closed elsewhere (e.g. take-profit sync) simply drop out here
+                self.live_monitored_symbols -= closed
+                symbols = list(self.live_monitored_symbols)
+                if not symbols:
+                    self._live_monitor_wakeup.clear()
+            if not symbols:
+                self._live_monitor_wakeup.wait()
+                continue
+
+            try:
+                pnl_by_symbol = self.binance_trader.get_live_pnl_all()
+                if pnl_by_symbol is not None:
+                    for symbol in symbols:
+                        self._check_live_trade(symbol, *pnl_by_symbol.get(symbol, (0.0, 0.0)))
+            except Exception as e:
+                # This is the only live-PNL thread, so a bad tick must not end it
+                print(f"🚨 Error in live PNL monitor: {e}")
 
-            pnl_usdt, pnl_percent = self.binance_trader.get_live_pnl(symbol)
-            with self.state.lock:
-                current_rsi = self.state.rsi_data.get(symbol)
-            
-            self.state.update_trade_pnl(symbol, pnl_percent, pnl_usdt, current_rsi)
-            
-            if isinstance(current_rsi, (int, float)) and current_rsi <= config.TRADE_CLOSE_RSI and pnl_usdt > 0.01:
-                print(f"--- Closing LIVE trade {symbol}: RSI dropped below {config.TRADE_CLOSE_RSI} while in profit. ---")
-                success, close_price = self.binance_trader.close_live_trade(symbol)
-                if success:
-                    self.state.close_trade(symbol, f"RSI Close (<{config.TRADE_CLOSE_RSI})", close_price, current_rsi)
-                    break
-            
             time.sleep(1.5)
 
-    def _monitor_paper_trade(self, symbol, trade):
-        with self.state.lock:
-            current_price = self.state.coin_data.get(symbol, {}).get('price')
-            current_rsi = self.state.rsi_data.get(symbol)
-        if not current_price: return
-        price_change_percent = ((trade['entry_price'] - current_price) / trade['entry_price']) * 100
-        pnl_percent = price_change_percent * trade['leverage']
-        pnl_usdt = (trade['trade_amount'] * trade['leverage']) * (price_change_percent / 100)
+    def _check_live_trade(self, symbol, pnl_usdt, pnl_percent):
+        current_rsi = self.state.rsi_data.get(symbol)
+
         self.state.update_trade_pnl(symbol, pnl_percent, pnl_usdt, current_rsi)
-        if not self.state.controls["global_pause_active"].is_set():
-            if pnl_percent >= config.TAKE_PROFIT_PERCENT:
+
+        if type(current_rsi) is float and current_rsi <= config.TRADE_CLOSE_RSI and pnl_usdt > 0.01:
+            with self._live_monitor_lock:
+                if symbol in self._closing_symbols: return # A close is already in flight
+                self._closing_symbols.add(symbol)
+            print(f"--- Closing LIVE trade {symbol}: RSI dropped below {config.TRADE_CLOSE_RSI} while in profit. ---")
+            self._close_pool.submit(self._close_live_trade, symbol, current_rsi)
+
+    def _close_live_trade(self, symbol, current_rsi):
+        try:
+            success, close_price = self.binance_trader.close_live_trade(symbol)
+            if success:
+                self.state.close_trade(symbol, f"RSI Close (<{config.TRADE_CLOSE_RSI})", close_price, current_rsi)
+        except Exception as e:
+            print(f"🚨 Error closing LIVE trade {symbol}: {e}")
+        finally:
+            with self._live_monitor_lock:
+                self._closing_symbols.discard(symbol)
+
+    def _open_live_trade(self, symbol, rsi_value, trade_amount, coin_details, log_message):
+        try:
+            stream_is_fresh = time.time() - self.state.market_data_time < self.LIVE_PRICE_MAX_AGE_SECONDS
+            last_price = coin_details['price'] if stream_is_fresh else None
+            order, tp_order, error_message = self.binance_trader.execute_short_trade(symbol, trade_amount, config.LEVERAGE, config.TAKE_PROFIT_PERCENT, last_price)
+            if order and tp_order:
+                entry_price = float(order['avgPrice'])
+                alert_number = self.db_manager.get_next_alert_number()
+                self.state.open_trade(symbol, entry_price, rsi_value, coin_details.get('change_24h', 0), "Live", alert_number, log_message, trade_amount=trade_amount)
+            else:
+                print(f"--- LIVE trade execution FAILED for {symbol}. Reason: {error_message} ---")
+                self.event_bus.publish('ADD_TO_COOLDOWN', {
+                    'symbol': symbol, 'reason': 'Live Fail',
+                    'end_time': time.time() + 300
+                })
+                with self.state.lock:
+                    self.state.add_alert_log(f"FAIL: {symbol}", error_message)
+        except Exception as e:
+            print(f"🚨 Error opening LIVE trade {symbol}: {e}")
+        finally:
+            with self._live_monitor_lock:
+                self._opening_symbols.discard(symbol)
+
+    def _get_paper_trade_constants(self, symbol, trade):
+        """Returns (percent factor, usdt factor, take-profit price), recomputed when the trade or TP setting changes."""
+        take_profit_percent = config.TAKE_PROFIT_PERCENT
+        cached = self._paper_trade_constants.get(symbol)
+        if cached and cached[0] == trade['alert_num'] and cached[1] == take_profit_percent:
+            return cached[2]
+        entry_price, leverage = trade['entry_price'], trade['leverage']
+        inv_entry = 1.0 / entry_price
+        constants = (
+            100 * leverage * inv_entry,
+            trade['trade_amount'] * leverage * inv_entry,
+            entry_price * (1 - take_profit_percent / (100 * leverage)),
+        )
+        self._paper_trade_constants[symbol] = (trade['alert_num'], take_profit_percent, constants)
+        return constants
+
+    def _monitor_paper_trades(self, paper_trades):
+        """Computes PNL and close conditions for all paper trades in one NumPy pass."""
+        coin_data, rsi_data = self.state.coin_data, self.state.rsi_data
+        symbols, prices = [], []
+        for symbol in paper_trades:
+            current_price = coin_data.get(symbol, {}).get('price')
+            if current_price:
+                symbols.append(symbol)
+                prices.append(current_price)
+        if not symbols: return
+
+        current_rsis = [rsi_data.get(symbol) for symbol in symbols]
+        prices = np.array(prices, dtype=np.float64)
+        entry_prices = np.array([paper_trades[symbol]['entry_price'] for symbol in symbols], dtype=np.float64)
+        constants = np.array([self._get_paper_trade_constants(symbol, paper_trades[symbol]) for symbol in symbols], dtype=np.float64)
+        rsi_values = np.array([rsi if type(rsi) is float else np.nan for rsi in current_rsis], dtype=np.float64)
+
+        price_drop = entry_prices - prices
+        pnl_percent = price_drop * constants[:, 0]
+        pnl_usdt = price_drop * constants[:, 1]
+        self.state.update_trade_pnls(zip(symbols, pnl_percent.tolist(), pnl_usdt.tolist(), current_rsis))
+        if self.state.controls["global_pause_active"].is_set(): return
+
+        take_profit_hit = prices <= constants[:, 2]
+        # NaN (no RSI yet) never compares true, so those trades only close on take-profit
+        rsi_close_hit = (rsi_values <= config.TRADE_CLOSE_RSI) & (pnl_usdt > 0)
+        for i in np.flatnonzero(take_profit_hit | rsi_close_hit).tolist():
+            symbol, current_price, current_rsi = symbols[i], prices[i].item(), current_rsis[i]
+            if take_profit_hit[i]:
                 self.state.close_trade(symbol, f"Target Profit (>{config.TAKE_PROFIT_PERCENT}%)", current_price, current_rsi or 0)
-                return
-            if isinstance(current_rsi, (int, float)) and current_rsi <= config.TRADE_CLOSE_RSI and pnl_usdt > 0:
+            else:
                 self.state.close_trade(symbol, f"RSI Close (<{config.TRADE_CLOSE_RSI})", current_price, current_rsi)
-                return
 
     def handle_rsi_update(self, data):
-        symbol, rsi_value = data['symbol'], data['rsi']
-        if not isinstance(rsi_value, (int, float)): return
-        
-        with self.state.lock:
-            is_in_trade = symbol in self.state.active_trades
-            cooldown_info = self.state.cooldowned_coins.get(symbol)
-            is_on_cooldown = cooldown_info and time.time() < cooldown_info['end_time']
-
-        if self.state.can_open_new_trade() and rsi_value > config.RSI_ALERT_THRESHOLD and not is_in_trade and not is_on_cooldown:
-            with self.state.lock:
-                coin_details = self.state.coin_data.get(symbol)
-                if not coin_details: return
-                trade_amount = config.TRADE_AMOUNT_FIXED_USDT if config.TRADE_AMOUNT_TYPE == 'fixed_usdt' else (self.state.portfolio['balance'] * config.TRADE_AMOUNT_PERCENTAGE) / 100
-                required_margin = max(trade_amount, 5.1)
-                if self.state.portfolio['balance'] < required_margin:
-                    if not hasattr(self, '_logged_balance_error'):
-                        print(f"--- Skipping trade: Insufficient balance ({self.state.portfolio['balance']:.2f} USDT) to meet requirement of {required_margin:.2f} USDT. ---")
-                        self._logged_balance_error = True
-                    return
-                else:
-                    if hasattr(self, '_logged_balance_error'): del self._logged_balance_error
+        """Evaluates every symbol whose RSI changed since the last STATE_UPDATED_RSI."""
+        rsi_data, threshold = self.state.rsi_data, config.RSI_ALERT_THRESHOLD
+        for symbol in data['symbols']:
+            rsi_value = rsi_data.get(symbol)
+            # Almost every symbol is below the alert threshold, so reject those before any other check
+            if type(rsi_value) is float and rsi_value > threshold:
+                self._evaluate_trade_candidate(symbol, rsi_value)
+
+    def _evaluate_trade_candidate(self, symbol, rsi_value):
+        """Opens a trade for a symbol whose RSI is already known to be above the alert threshold."""
+        # Single dict lookups are atomic, so these reads do not need the state lock
+        is_in_trade = symbol in self.state.active_trades
+        cooldown_info = self.state.cooldowned_coins.get(symbol)
+        is_on_cooldown = cooldown_info and time.time() < cooldown_info['end_time']
+
+        if self.state.can_open_new_trade() and not is_in_trade and not is_on_cooldown:
+            coin_details = self.state.coin_data.get(symbol)
+            if not coin_details: return
+            balance = self.state.portfolio['balance']
+            trade_amount = config.TRADE_AMOUNT_FIXED_USDT if config.TRADE_AMOUNT_TYPE == 'fixed_usdt' else (balance * config.TRADE_AMOUNT_PERCENTAGE) / 100
+            required_margin = max(trade_amount, 5.1)
+            if balance < required_margin:
+                if not hasattr(self, '_logged_balance_error'):
+                    print(f"--- Skipping trade: Insufficient balance ({balance:.2f} USDT) to meet requirement of {required_margin:.2f} USDT. ---")
+                    self._logged_balance_error = True
+                return
+            else:
+                if hasattr(self, '_logged_balance_error'): del self._logged_balance_error
 
             log_message = f"RSI: {rsi_value:.2f}"
             print(f"--- Fresh Trade Candidate: {symbol} ({log_message}). Attempting to open trade. ---")
             
             if config.LIVE_TRADING_ENABLED:
-                order, tp_order, error_message = self.binance_trader.execute_short_trade(symbol, trade_amount, config.LEVERAGE, config.TAKE_PROFIT_PERCENT)
-                if order and tp_order:
-                    entry_price = float(order['avgPrice'])
-                    alert_number = self.db_manager.get_next_alert_number()
-                    self.state.open_trade(symbol, entry_price, rsi_value, coin_details.get('change_24h', 0), "Live", alert_number, log_message, trade_amount=trade_amount)
-                else:
-                    print(f"--- LIVE trade execution FAILED for {symbol}. Reason: {error_message} ---")
-                    self.event_bus.publish('ADD_TO_COOLDOWN', {
-                        'symbol': symbol, 'reason': 'Live Fail',
-                        'end_time': time.time() + 300
-                    })
-                    with self.state.lock:
-                        self.state.add_alert_log(f"FAIL: {symbol}", error_message)
+                with self._live_monitor_lock:
+                    if symbol in self._opening_symbols: return # An order is already in flight
+                    self._opening_symbols.add(symbol)
+                self._open_pool.submit(self._open_live_trade, symbol, rsi_value, trade_amount, coin_details, log_message)
             else:
                 alert_number = self.db_manager.get_next_alert_number()
                 self.state.open_trade(symbol, coin_details['price'], rsi_value, coin_details.get('change_24h'), "Bot", alert_number, log_message)
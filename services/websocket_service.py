@@ -1,8 +1,10 @@
 import websocket
-import json
+import queue
+import socket
 import time
 import config
 import threading
+import orjson
 import requests
 from .base_service import BaseService
 
@@ -10,6 +12,13 @@ class WebSocketService(BaseService):
     """
     Manages the WebSocket connection to Binance for live market data.
     """
+    # Raw frames waiting for the parser thread; when it falls this far behind, the socket thread waits for it
+    MESSAGE_QUEUE_SIZE = 4
+    # No frame for this long means the stream is stale and the connection is recycled
+    STALE_AFTER_SECONDS = 30
+    # Tighter than websocket-client's default keepalive: a dead peer is dropped by the kernel after ~30s
+    TCP_KEEPALIVE_OPTIONS = (('TCP_KEEPIDLE', 15), ('TCP_KEEPINTVL', 5), ('TCP_KEEPCNT', 3))
+
     def __init__(self, state_manager, event_bus):
         super().__init__(state_manager, event_bus)
         self.ws_app = None
@@ -17,7 +26,12 @@ class WebSocketService(BaseService):
         self.monitoring_thread = None
         self.stop_monitoring = threading.Event()
         self.session = requests.Session()
-        self.valid_futures_symbols = set()
+        # Replaced wholesale on refresh, so the parser thread never iterates a set that is being rebuilt
+        self.valid_futures_symbols = frozenset()
+        # on_message only queues frames; decoding and state updates happen on the parser thread
+        self._message_queue = queue.Queue(maxsize=self.MESSAGE_QUEUE_SIZE)
+        self._parser_thread = threading.Thread(target=self._parse_messages, name="ws-parser", daemon=True)
+        self._parser_thread.start()
         self.fetch_listing_times() # Initial fetch
         # --- NEW: Start a thread to periodically refresh the symbol list ---
         self.refresher_thread = threading.Thread(target=self._periodically_refresh_symbols, daemon=True)
@@ -40,18 +54,16 @@ class WebSocketService(BaseService):
         try:
             response = self.session.get("https://fapi.binance.com/fapi/v1/exchangeInfo", timeout=10 )
             response.raise_for_status()
-            data = response.json()
-
-            listing_times = {}
-            # Build the set of valid symbols during the fetch
-            self.valid_futures_symbols.clear()
-            for symbol_info in data['symbols']:
-                # Ensure it's a USDT perpetual contract
-                if symbol_info['symbol'].endswith('USDT') and symbol_info.get('contractType') == 'PERPETUAL':
-                    self.valid_futures_symbols.add(symbol_info['symbol'])
-                    if 'onboardDate' in symbol_info:
-                        # Convert milliseconds to seconds
-                        listing_times[symbol_info['symbol']] = symbol_info['onboardDate'] / 1000
+            data = orjson.loads(response.content)
+
+            # Ensure it's a USDT perpetual contract
+            perpetuals = [symbol_info for symbol_info in data['symbols']
+                          if symbol_info['symbol'].endswith('USDT') and symbol_info.get('contractType') == 'PERPETUAL']
+            # Convert milliseconds to seconds
+            listing_times = {symbol_info['symbol']: symbol_info['onboardDate'] / 1000
+                             for symbol_info in perpetuals if 'onboardDate' in symbol_info}
+            # Built in one go and swapped in with a single assignment
+            self.valid_futures_symbols = frozenset(symbol_info['symbol'] for symbol_info in perpetuals)
 
             self.state.update_listing_times(listing_times)
             print(f"--- Successfully fetched info for {len(self.valid_futures_symbols)} valid futures symbols. ---")
@@ -81,21 +93,36 @@ class WebSocketService(BaseService):
                 on_error=self.on_error,
                 on_close=self.on_close
             )
-            self.ws_app.run_forever()
+            # orjson validates UTF-8 in C while parsing, so skip websocket-client's pure-Python
+            # validation and str decode; frames then reach on_message as raw bytes
+            self.ws_app.run_forever(skip_utf8_validation=True, sockopt=self._keepalive_sockopts())
             print(f"--- WebSocket connection closed. Reconnecting in {config.WEBSOCKET_REFRESH_SECONDS} seconds... ---")
             time.sleep(config.WEBSOCKET_REFRESH_SECONDS)
 
+    @classmethod
+    def _keepalive_sockopts(cls):
+        """TCP keepalive socket options, limited to the ones this platform exposes."""
+        return [(socket.IPPROTO_TCP, getattr(socket, name), value)
+                for name, value in cls.TCP_KEEPALIVE_OPTIONS if hasattr(socket, name)]
+
     def _monitor_connection(self):
+        """
+        Recycles a connection that is open but silent. Dead peers are caught by TCP keepalive,
+        so this only sleeps until the current staleness deadline instead of polling.
+        """
         print("--- WebSocket Health Monitor started. ---")
         while not self.stop_monitoring.is_set():
+            wait_seconds = self.STALE_AFTER_SECONDS
             if self.last_message_time:
                 time_since_last_message = time.time() - self.last_message_time
-                if time_since_last_message > 30:
-                    print("!!! WebSocket STALE: No message received in 30s. Forcing reconnection. !!!")
+                if time_since_last_message > self.STALE_AFTER_SECONDS:
+                    print(f"!!! WebSocket STALE: No message received in {self.STALE_AFTER_SECONDS}s. Forcing reconnection. !!!")
                     self.last_message_time = time.time()
                     if self.ws_app:
                         self.ws_app.close()
-            time.sleep(10)
+                else:
+                    wait_seconds = self.STALE_AFTER_SECONDS - time_since_last_message + 1
+            self.stop_monitoring.wait(wait_seconds)
 
     def on_message(self, ws, message):
         """Callback for when a new message is received from the WebSocket."""
@@ -103,23 +130,48 @@ class WebSocketService(BaseService):
         if not self.state.controls["websocket_enabled"].is_set():
             if self.ws_app: self.ws_app.close()
             return
-        
+
+        # Never drop a frame: !ticker@arr only carries the symbols that changed, so a lost frame
+        # would leave those prices stale until they move again. The parser drains the whole backlog
+        # in one pass, so this only blocks briefly.
+        self._message_queue.put(message)
+
+    def _drain_messages(self):
+        """Blocks for the next frame, then takes every other frame already queued."""
+        messages = [self._message_queue.get()]
         try:
-            data_list = json.loads(message)
-            
-            # Filter the data to only include valid futures symbols from our refreshed set
-            valid_data = [
-                item for item in data_list 
-                if item.get('s') in self.valid_futures_symbols
-            ]
-            
-            if valid_data:
-                self.state.update_market_data(valid_data)
-
-        except json.JSONDecodeError:
-            print("🚨 WebSocket: Could not decode JSON message.")
-        except Exception as e:
-            print(f"🚨 WebSocket: Error processing message: {e}")
+            while True:
+                messages.append(self._message_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return messages
+
+    def _parse_messages(self):
+        """Decodes queued ticker frames and applies them to the market state."""
+        while True:
+            messages = self._drain_messages()
+            frames = []
+            for message in messages:
+                try:
+                    frames.append(orjson.loads(message))
+                except orjson.JSONDecodeError:
+                    print("🚨 WebSocket: Could not decode JSON message.")
+            if not frames:
+                continue
+            if len(frames) == 1:
+                rows = frames[0]
+            else:
+                # A backlog is merged per symbol in arrival order, so each symbol keeps its latest ticker
+                latest = {}
+                for frame in frames:
+                    for data in frame:
+                        latest[data.get('s')] = data
+                rows = list(latest.values())
+            try:
+                # The state applies the valid-symbol filter in its own pass, so no filtered copy is built here
+                self.state.update_market_data(rows, self.valid_futures_symbols)
+            except Exception as e:
+                print(f"🚨 WebSocket: Error processing message: {e}")
 
     def on_error(self, ws, error):
         if "Connection is already closed" not in str(error):
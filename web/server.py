@@ -1,7 +1,8 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
+from flask.json.provider import JSONProvider
 import pandas as pd
-import sqlite3
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 import os
 import re
 import shutil
@@ -9,8 +10,9 @@ import time
 import config
 import threading
 import numpy as np
-import json
+import orjson
 import logging
+from persistence.database_manager import format_timestamp
 
 def to_serializable(obj):
     """Converts NumPy, Pandas, and datetime types to JSON-safe types."""
@@ -21,19 +23,99 @@ def to_serializable(obj):
     elif isinstance(obj, (set, tuple)): return list(obj)
     return obj
 
+# Settings exposed by /get-config and editable by /update-config; values are still read live from config
+CONFIG_KEYS = frozenset(var for var in vars(config) if var.isupper())
+# Top-level 'NAME = value' assignment in config.py
+CONFIG_ASSIGNMENT_RE = re.compile(r"^(\w+)\s*=")
+
+# /database display formats: (columns, format); numbers are formatted before missing values become ''
+DATABASE_COLUMN_FORMATS = (
+    (('Entry Price', 'Exit Price', 'Max Neg PNL ($)'), '{:.8f}'),
+    (('PNL (%)', 'Entry RSI', 'Exit RSI', '24h Change %', 'Max Neg PNL %', 'Max Neg RSI'), '{:.2f}'),
+    (('PNL (USDT)', 'Trade Amount', 'Leveraged Amount'), '{:.4f}'),
+)
+
+def format_number_column(series, fmt):
+    """Formats the numbers in a column and leaves any stored text as-is; missing values stay NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        # Homogeneous numeric column: one bound-method call per value, no per-cell type checks
+        return series.map(fmt.format, na_action='ignore')
+    return series.map(lambda x: fmt.format(x) if isinstance(x, (int, float)) else x, na_action='ignore')
+
+class OrjsonProvider(JSONProvider):
+    """Routes jsonify() and request.json through orjson; to_serializable only sees types orjson cannot handle itself."""
+    OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=to_serializable, option=self.OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response instead of round-tripping through str
+        body = orjson.dumps(self._prepare_response_obj(args, kwargs), default=to_serializable, option=self.OPTIONS)
+        return self._app.response_class(body, mimetype='application/json')
+
 def create_flask_app(state_manager, db_manager, websocket_service, trading_service):
     """Creates and configures the Flask application."""
     app = Flask(__name__, template_folder='templates')
+    app.json = OrjsonProvider(app)
     
     log = logging.getLogger('werkzeug')
     log.setLevel(logging.ERROR)
 
-    def parse_custom_date(date_str):
-        if not date_str or not isinstance(date_str, str): return None
-        try: return datetime.strptime(date_str, '%d-%m-%Y -> %I:%M:%S %p')
-        except ValueError:
-            try: return datetime.fromisoformat(date_str)
-            except (ValueError, TypeError): return None
+    # Coin-list refreshes run on one reusable worker; a request arriving mid-refresh is answered as busy
+    refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+    refresh_lock = threading.Lock()
+    refresh_inflight = [None]
+
+    # Encoded database views, reused until the database manager reports a new committed write
+    view_cache = {}
+
+    def cached_view_response(name, db_path, build_frame):
+        # Read the version before querying, so a write that lands mid-build only costs one extra rebuild
+        version = db_manager.data_version(db_path)
+        cached = view_cache.get(name)
+        if cached is None or cached[0] != version:
+            # Encoded straight from the columns, without materializing one dict per row
+            body = build_frame().to_json(orient='records', double_precision=15, force_ascii=False).encode('utf-8')
+            cached = view_cache[name] = (version, body)
+        return Response(cached[1], mimetype='application/json')
+
+    # symbol -> (coin_data entry, row) for coins that are neither trading nor on cooldown. Entries are
+    # replaced rather than mutated on every price change, so the same entry object means the same row.
+    idle_market_rows = [{}]
+
+    # Closed paper trades of the last 24h as sorted entry times with running PNL/loss sums, reloaded only
+    # when the trades database commits; between writes, trades can only age out of the window.
+    # Replaced as a whole tuple: (data version, entry times, running PNL sums, running loss counts)
+    recent_closed = [(None, None, None, None)]
+
+    def get_stats_24h():
+        cutoff = time.time() - 86400
+        version = db_manager.data_version()
+        cached_version, timestamps, pnl_sums, loss_counts = recent_closed[0]
+        if cached_version != version:
+            # A missing PNL counts as a 0.0 success, as before
+            rows = db_manager._read_rows(
+                "SELECT Timestamp_ts, COALESCE(CAST(PNL_USDT AS REAL), 0.0) FROM trades "
+                "WHERE Timestamp_ts > ? AND Status = 'Closed' AND (Source IS NULL OR Source != 'Live') ORDER BY Timestamp_ts",
+                (cutoff,)
+            )
+            timestamps = np.array([row[0] for row in rows], dtype=np.float64)
+            pnl = np.array([row[1] for row in rows], dtype=np.float64)
+            pnl_sums = np.concatenate(([0.0], np.cumsum(pnl)))
+            loss_counts = np.concatenate(([0], np.cumsum(pnl < 0)))
+            # An empty result is re-read next poll, since a failed read also returns no rows
+            recent_closed[0] = (version if rows else None, timestamps, pnl_sums, loss_counts)
+        start = int(np.searchsorted(timestamps, cutoff, side='right'))
+        trade_count = len(timestamps) - start
+        failed_trades = int(loss_counts[-1] - loss_counts[start])
+        return {
+            "profit_loss": float(pnl_sums[-1] - pnl_sums[start]),
+            "trade_count": trade_count, "success_trades": trade_count - failed_trades, "failed_trades": failed_trades,
+        }
 
     @app.route('/')
     def index():
@@ -41,7 +123,8 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
 
     @app.route('/data')
     def get_data():
-        state = state_manager.get_full_state_snapshot()
+        # Polled every second: use live views of the market/RSI dicts instead of copying them
+        state = state_manager.get_readonly_snapshot()
         
         paper_unrealized_pnl = 0
         paper_trade_amount = 0
@@ -65,28 +148,14 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
         stats_24h = {"profit_loss": 0.0, "trade_count": 0, "success_trades": 0, "failed_trades": 0}
         if os.path.exists(config.DATABASE_FILE):
             try:
-                conn = sqlite3.connect(config.DATABASE_FILE)
-                df = pd.read_sql_query("SELECT * FROM trades", conn)
-                conn.close()
-
-                if not df.empty:
-                    df['Timestamp_dt'] = df['Timestamp'].apply(parse_custom_date)
-                    twenty_four_hours_ago = datetime.now() - timedelta(hours=24)
-                    recent_trades = df[
-                        (df['Timestamp_dt'] > twenty_four_hours_ago) & 
-                        (df['Status'] == 'Closed') & (df['Source'] != 'Live')
-                    ]
-                    pnl_usdt_series = pd.to_numeric(recent_trades['PNL_USDT'], errors='coerce').fillna(0)
-                    stats_24h['profit_loss'] = pnl_usdt_series.sum()
-                    stats_24h['trade_count'] = len(recent_trades)
-                    stats_24h['success_trades'] = len(recent_trades[pnl_usdt_series >= 0])
-                    stats_24h['failed_trades'] = len(recent_trades[pnl_usdt_series < 0])
+                stats_24h = get_stats_24h()
             except Exception as e:
                 print(f"Warning: Could not calculate 24h stats. Error: {e}")
         
         market_data_list = []
-        hot_coins_count = 0
-        for symbol, data in state['coin_data'].items():
+        now = time.time()
+        previous_idle_rows, idle_rows = idle_market_rows[0], {}
+        for symbol, data in list(state['coin_data'].items()):
             status, pnl_percent, pnl_usdt, entry_price, status_reason, source, cooldown_end_time = "available", None, None, None, "", "Bot", None
             if symbol in state['active_trades']:
                 trade = state['active_trades'][symbol]
@@ -94,19 +163,27 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
                 pnl_percent, pnl_usdt, entry_price = trade.get('pnl_percent'), trade.get('pnl_usdt'), trade.get('entry_price')
             elif symbol in state['alerted_coins']: # alerted_coins now comes from cooldowned_coins
                 cooldown_info = state['alerted_coins'][symbol]
-                if time.time() < cooldown_info.get('end_time', 0):
+                if now < cooldown_info.get('end_time', 0):
                     status = "cooldown"
                     status_reason, cooldown_end_time = cooldown_info.get('reason', ''), cooldown_info.get('end_time')
             
-            if data.get('change_24h', 0) >= config.RSI_HOT_COIN_THRESHOLD:
-                hot_coins_count += 1
-            
-            data.update({'status': status, 'pnl': pnl_percent, 'pnl_usdt': pnl_usdt, 'entry_price': entry_price, 'status_reason': status_reason, 'cooldown_end_time': cooldown_end_time})
-            market_data_list.append({'symbol': symbol, **data})
+            if status == "available":
+                cached = previous_idle_rows.get(symbol)
+                if cached is not None and cached[0] is data:
+                    row = cached[1]
+                else:
+                    row = {'symbol': symbol, **data, 'status': status, 'pnl': None, 'pnl_usdt': None, 'entry_price': None, 'status_reason': "", 'cooldown_end_time': None}
+                idle_rows[symbol] = (data, row)
+            else:
+                # Build a new row; the shared coin_data entry must not be mutated
+                row = {'symbol': symbol, **data, 'status': status, 'pnl': pnl_percent, 'pnl_usdt': pnl_usdt, 'entry_price': entry_price, 'status_reason': status_reason, 'cooldown_end_time': cooldown_end_time}
+            market_data_list.append(row)
+        # Rebuilt every poll, so coins that left the market list do not linger
+        idle_market_rows[0] = idle_rows
         
         stats = {
             "total_coins": len(state['coin_data']), "rsi_monitoring": len(state['rsi_data']),
-            "hot_coins": hot_coins_count, "open_trades": len(state['active_trades']),
+            "hot_coins": state_manager.get_hot_coins_count(), "open_trades": len(state['active_trades']),
             "cooldown_coins": len(state['alerted_coins']),
             "max_trades": config.MAX_OPEN_TRADES, "hot_coin_threshold": config.RSI_HOT_COIN_THRESHOLD,
             "global_stats": state['global_stats'], "stats_24h": stats_24h,
@@ -114,71 +191,73 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
         }
         
         data_response = {
-            "market_data": market_data_list, "rsi_values": state['rsi_data'],
+            "market_data": market_data_list, "rsi_values": dict(state['rsi_data']),
             "rsi_status": state['rsi_status'], "statistics": stats,
             "control_status": state['controls'], "portfolio": portfolio_data,
             "styles": state['styles'], "hide_cooldown_details": config.HIDE_COOLDOWN_DETAILS
         }
 
-        safe_response = json.loads(json.dumps(data_response, default=to_serializable))
-        return jsonify(safe_response)
+        return jsonify(data_response)
+
+    def build_trades_frame():
+        # Read-only pooled connection: never waits on the database writer
+        # Alert_id is the INTEGER PRIMARY KEY (rowid), so SQLite returns newest-first by walking the table backwards
+        df = db_manager._read_db_to_df("SELECT * FROM trades ORDER BY Alert_id DESC")
+        # New rows only store the epoch Timestamp_ts; older rows keep their text Timestamp
+        if 'Timestamp_ts' in df.columns:
+            has_ts = df['Timestamp_ts'].notna()
+            df['Timestamp'] = df['Timestamp'].astype(object)
+            df.loc[has_ts, 'Timestamp'] = df.loc[has_ts, 'Timestamp_ts'].map(format_timestamp)
+            df = df.drop(columns=['Timestamp_ts'])
+        df.rename(columns={
+            'Alert_id': 'Alert #', 'PNL_pct': 'PNL (%)', 'PNL_USDT': 'PNL (USDT)',
+            'Change_24h_pct': '24h Change %', 'Entry_Price': 'Entry Price',
+            'Exit_Price': 'Exit Price', 'Entry_RSI': 'Entry RSI', 'Exit_RSI': 'Exit RSI',
+            'Trade_Amount': 'Trade Amount', 'Leveraged_Amount': 'Leveraged Amount',
+            'Exit_Time': 'Exit Time', 'Trade_Duration_Hours': 'Duration (H)',
+            'max_neg_pnl_pct': 'Max Neg PNL %', 'max_neg_pnl_usdt': 'Max Neg PNL ($)',
+            'max_neg_rsi': 'Max Neg RSI'
+        }, inplace=True)
+        for columns, fmt in DATABASE_COLUMN_FORMATS:
+            for col in columns:
+                if col in df.columns: df[col] = format_number_column(df[col], fmt)
+        if 'Duration (H)' in df.columns:
+            df['Duration (H)'] = pd.to_numeric(df['Duration (H)'], errors='coerce').map('{:.2f}'.format, na_action='ignore')
+        return df.fillna('')
 
     @app.route('/database')
     def get_database():
-       with db_manager.db_lock:
-            if not os.path.exists(config.DATABASE_FILE): return jsonify([])
-            try:
-                conn = sqlite3.connect(config.DATABASE_FILE)
-                df = pd.read_sql_query("SELECT * FROM trades", conn)
-                conn.close()
-                df.rename(columns={
-                    'Alert_id': 'Alert #', 'PNL_pct': 'PNL (%)', 'PNL_USDT': 'PNL (USDT)',
-                    'Change_24h_pct': '24h Change %', 'Entry_Price': 'Entry Price',
-                    'Exit_Price': 'Exit Price', 'Entry_RSI': 'Entry RSI', 'Exit_RSI': 'Exit RSI',
-                    'Trade_Amount': 'Trade Amount', 'Leveraged_Amount': 'Leveraged Amount',
-                    'Exit_Time': 'Exit Time', 'Trade_Duration_Hours': 'Duration (H)',
-                    'max_neg_pnl_pct': 'Max Neg PNL %', 'max_neg_pnl_usdt': 'Max Neg PNL ($)',
-                    'max_neg_rsi': 'Max Neg RSI'
-                }, inplace=True)
-                df = df.sort_values(by='Alert #', ascending=False).fillna('')
-                for col in ['Entry Price', 'Exit Price', 'Max Neg PNL ($)']:
-                    if col in df.columns: df[col] = df[col].apply(lambda x: f'{x:.8f}' if isinstance(x, (int, float)) and x != '' else x)
-                for col in ['PNL (%)', 'Entry RSI', 'Exit RSI', '24h Change %', 'Max Neg PNL %', 'Max Neg RSI']:
-                     if col in df.columns: df[col] = df[col].apply(lambda x: (f'{x:.2f}' if isinstance(x, (int, float)) else x) if x != '' else x)
-                if 'Duration (H)' in df.columns:
-                    df['Duration (H)'] = pd.to_numeric(df['Duration (H)'], errors='coerce').apply(lambda x: f'{x:.2f}' if pd.notna(x) else '')
-                for col in ['PNL (USDT)', 'Trade Amount', 'Leveraged Amount']:
-                    if col in df.columns: df[col] = df[col].apply(lambda x: f'{x:.4f}' if isinstance(x, (int, float)) and x != '' else x)
-                return jsonify(df.to_dict('records'))
-            except Exception as e: return jsonify({"error": str(e)}), 500
+        if not os.path.exists(config.DATABASE_FILE): return jsonify([])
+        try:
+            return cached_view_response('trades', db_manager.db_path, build_trades_frame)
+        except Exception as e: return jsonify({"error": str(e)}), 500
+
+    def build_cooldown_frame():
+        df = db_manager._read_db_to_df("SELECT * FROM cooldowns ORDER BY exit_date DESC", db_path=config.COOLDOWN_DATABASE_FILE)
+            
+        df['entry_date'] = df['entry_date'].apply(format_timestamp)
+        df['exit_date'] = df['exit_date'].apply(format_timestamp)
+            
+        df.rename(columns={
+            'symbol': 'Coin Name', 'entry_date': 'Entry Date', 
+            'exit_date': 'Expected Exit Date', 'reason': 'Reason of Cooldown'
+        }, inplace=True)
+            
+        return df
 
     # --- NEW ENDPOINT ---
     @app.route('/cooldown-database')
     def get_cooldown_database():
-        with db_manager.db_lock:
-            if not os.path.exists(config.COOLDOWN_DATABASE_FILE):
-                return jsonify([])
-            try:
-                conn = sqlite3.connect(config.COOLDOWN_DATABASE_FILE)
-                df = pd.read_sql_query("SELECT * FROM cooldowns ORDER BY exit_date DESC", conn)
-                conn.close()
-                
-                df['entry_date'] = df['entry_date'].apply(lambda ts: datetime.fromtimestamp(ts).strftime('%d-%m-%Y -> %I:%M:%S %p'))
-                df['exit_date'] = df['exit_date'].apply(lambda ts: datetime.fromtimestamp(ts).strftime('%d-%m-%Y -> %I:%M:%S %p'))
-                
-                df.rename(columns={
-                    'symbol': 'Coin Name', 'entry_date': 'Entry Date', 
-                    'exit_date': 'Expected Exit Date', 'reason': 'Reason of Cooldown'
-                }, inplace=True)
-                
-                return jsonify(df.to_dict('records'))
-            except Exception as e:
-                return jsonify({"error": str(e)}), 500
+        if not os.path.exists(config.COOLDOWN_DATABASE_FILE):
+            return jsonify([])
+        try:
+            return cached_view_response('cooldowns', db_manager.cooldown_db_path, build_cooldown_frame)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
 
     @app.route('/alerts')
     def get_alerts():
-        with state_manager.lock:
-            return jsonify(state_manager.alert_log[:20])
+        return jsonify(state_manager.get_recent_alerts(20))
 
     @app.route('/toggle-control', methods=['POST'])
     def toggle_control():
@@ -189,16 +268,18 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
 
     @app.route('/manual-close/<symbol>', methods=['POST'])
     def manual_close(symbol):
+        # Only the reads happen under the lock; close_trade takes it again for its own update
         with state_manager.lock:
-            if symbol not in state_manager.active_trades:
+            trade = state_manager.active_trades.get(symbol)
+            if trade is None:
                 return jsonify({"status": "error", "message": "Trade not found."}), 404
-            trade_source = state_manager.active_trades[symbol].get('source', 'Bot').lower()
-            if trade_source == 'live':
-                print(f"--- UI instruction to close LIVE trade for {symbol}. Please close manually on Binance. ---")
-                state_manager.close_trade(symbol, "Manual Close (Live)", 0, 0)
-                return jsonify({"status": "success", "message": f"Live trade {symbol} marked as closed. Please verify on Binance."})
-            current_price = state_manager.coin_data.get(symbol, {}).get('price', state_manager.active_trades[symbol]['entry_price'])
+            trade_source = trade.get('source', 'Bot').lower()
+            current_price = state_manager.coin_data.get(symbol, {}).get('price', trade['entry_price'])
             current_rsi = state_manager.rsi_data.get(symbol, 0)
+        if trade_source == 'live':
+            print(f"--- UI instruction to close LIVE trade for {symbol}. Please close manually on Binance. ---")
+            state_manager.close_trade(symbol, "Manual Close (Live)", 0, 0)
+            return jsonify({"status": "success", "message": f"Live trade {symbol} marked as closed. Please verify on Binance."})
         state_manager.close_trade(symbol, "Manual Close", current_price, current_rsi)
         return jsonify({"status": "success", "message": f"Manual close initiated for {symbol}."})
 
@@ -226,7 +307,7 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
         trade_data = None
         with state_manager.lock:
             if symbol in state_manager.active_trades:
-                trade_data = state_manager.active_trades.pop(symbol)
+                trade_data = state_manager.remove_active_trade(symbol)
                 # --- MODIFIED: Publish event to add to cooldown ---
                 state_manager.event_bus.publish('ADD_TO_COOLDOWN', {
                     'symbol': symbol, 'reason': 'Discarded',
@@ -264,10 +345,8 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
 
     @app.route('/get-config')
     def get_config():
-        current_config = {}
-        for var in dir(config):
-            if var.isupper():
-                current_config[var] = getattr(config, var)
+        config_values = vars(config)
+        current_config = {var: config_values[var] for var in CONFIG_KEYS}
         with state_manager.lock:
             current_config['portfolio_balance'] = state_manager.portfolio['balance']
             current_config.update(state_manager.styles)
@@ -280,28 +359,32 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
             config_path = os.path.join(os.path.dirname(__file__), '..', 'config.py')
             with open(config_path, 'r', encoding='utf-8') as f:
                 lines = f.readlines()
-            config_vars_to_update = [var for var in dir(config) if var.isupper()]
+            # One pass maps each assigned name to its line(s), so every changed key is a dict lookup
+            assignment_lines = {}
             for i, line in enumerate(lines):
-                for var, value in new_config.items():
-                    if var in config_vars_to_update and re.match(rf"^{var}\s*=\s*.*", line):
-                        if hasattr(config, var):
-                            original_type = type(getattr(config, var))
-                            try:
-                                if original_type == bool:
-                                    live_value = str(value).lower() in ['true', '1', 't', 'y', 'yes']
-                                else:
-                                    live_value = original_type(value)
-                                setattr(config, var, live_value)
-                            except (ValueError, TypeError):
-                                print(f"Warning: Could not live-update '{var}'.")
-                        if isinstance(value, str) and not value.replace('.', '', 1).isdigit():
-                             if isinstance(getattr(config, var, None), bool):
-                                 lines[i] = f'{var} = {str(value).title()}\n'
-                             else:
-                                 lines[i] = f'{var} = "{value}"\n'
-                        else:
-                             lines[i] = f'{var} = {value}\n'
-                        break
+                match = CONFIG_ASSIGNMENT_RE.match(line)
+                if match:
+                    assignment_lines.setdefault(match.group(1), []).append(i)
+            for var, value in new_config.items():
+                if var not in CONFIG_KEYS: continue
+                for i in assignment_lines.get(var, ()):
+                    if hasattr(config, var):
+                        original_type = type(getattr(config, var))
+                        try:
+                            if original_type == bool:
+                                live_value = str(value).lower() in ['true', '1', 't', 'y', 'yes']
+                            else:
+                                live_value = original_type(value)
+                            setattr(config, var, live_value)
+                        except (ValueError, TypeError):
+                            print(f"Warning: Could not live-update '{var}'.")
+                    if isinstance(value, str) and not value.replace('.', '', 1).isdigit():
+                         if isinstance(getattr(config, var, None), bool):
+                             lines[i] = f'{var} = {str(value).title()}\n'
+                         else:
+                             lines[i] = f'{var} = "{value}"\n'
+                    else:
+                         lines[i] = f'{var} = {value}\n'
             with open(config_path, 'w', encoding='utf-8') as f:
                 f.writelines(lines)
             with state_manager.lock:
@@ -325,26 +408,29 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
         action = request.json.get('action')
         msg = "Invalid action."
         if action == 'close_all_trades':
+            # Snapshot under the lock, then close outside it: a live close is a Binance round-trip
             with state_manager.lock:
-                symbols_to_close = list(state_manager.active_trades.keys())
-            for symbol in symbols_to_close:
-                with state_manager.lock:
-                    trade = state_manager.active_trades.get(symbol)
-                    if not trade: continue
-                    if trade.get('source', 'Bot').lower() == 'live':
-                        trading_service.binance_trader.close_live_trade(symbol)
-                        state_manager.close_trade(symbol, "Master Close All", 0, 0)
-                    else:
-                        current_price = state_manager.coin_data.get(symbol, {}).get('price', trade['entry_price'])
-                        current_rsi = state_manager.rsi_data.get(symbol, 0)
-                        state_manager.close_trade(symbol, "Master Close All", current_price, current_rsi)
-            msg = f"Initiated closing for all {len(symbols_to_close)} trades."
+                trades_to_close = [
+                    (symbol, trade.get('source', 'Bot').lower() == 'live', trade['entry_price'])
+                    for symbol, trade in state_manager.active_trades.items()
+                ]
+            for symbol, is_live, entry_price in trades_to_close:
+                if symbol not in state_manager.active_trades: continue # Closed meanwhile
+                if is_live:
+                    trading_service.binance_trader.close_live_trade(symbol)
+                    state_manager.close_trade(symbol, "Master Close All", 0, 0)
+                else:
+                    # Read price and RSI at close time; earlier live closes may have taken seconds
+                    current_price = state_manager.coin_data.get(symbol, {}).get('price', entry_price)
+                    state_manager.close_trade(symbol, "Master Close All", current_price, state_manager.rsi_data.get(symbol, 0))
+            msg = f"Initiated closing for all {len(trades_to_close)} trades."
         elif action == 'discard_trades':
             with state_manager.lock:
-                num_trades = len(state_manager.active_trades)
-                for symbol in list(state_manager.active_trades.keys()):
-                    trade_data = state_manager.active_trades.pop(symbol)
-                    db_manager._update_trade_in_db(trade_data['alert_num'], "Closed", "Discarded (Master)", "N/A", "N/A", "N/A", "N/A", trade_data['entry_time'])
+                discarded = [state_manager.remove_active_trade(symbol) for symbol in list(state_manager.active_trades.keys())]
+            # Queued after the lock is released; the db writer commits these identical UPDATEs as one executemany
+            for trade_data in discarded:
+                db_manager._update_trade_in_db(trade_data['alert_num'], "Closed", "Discarded (Master)", "N/A", "N/A", "N/A", "N/A", trade_data['entry_time'])
+            num_trades = len(discarded)
             msg = f"Successfully discarded all {num_trades} open trades."
         elif action == 'remove_cooldowns':
             with state_manager.lock:
@@ -359,12 +445,9 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
                 state_manager.event_bus.publish('STATS_UPDATED')
             msg = "Global stats have been reset to zero."
         elif action == 'reset_database':
-            with db_manager.db_lock:
-                if os.path.exists(config.DATABASE_FILE):
-                    os.remove(config.DATABASE_FILE)
-                if os.path.exists(config.COOLDOWN_DATABASE_FILE):
-                    os.remove(config.COOLDOWN_DATABASE_FILE)
-                msg = "Database files have been deleted."
+            # The manager holds open connections, so it must close them before deleting the files
+            db_manager.reset_database()
+            msg = "Database files have been deleted."
         return jsonify({"status": "success", "message": msg})
 
     @app.route('/refresh-coin-list', methods=['POST'])
@@ -372,7 +455,10 @@ def create_flask_app(state_manager, db_manager, websocket_service, trading_servi
         if not websocket_service:
             return jsonify({"status": "error", "message": "WebSocket service not available."}), 500
         try:
-            threading.Thread(target=websocket_service.fetch_listing_times).start()
+            with refresh_lock:
+                if refresh_inflight[0] and not refresh_inflight[0].done():
+                    return jsonify({"status": "busy", "message": "Refresh already in progress."}), 202
+                refresh_inflight[0] = refresh_pool.submit(websocket_service.fetch_listing_times)
             return jsonify({"status": "success", "message": "Refresh initiated."})
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500